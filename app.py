@@ -1,54 +1,20 @@
+import os
+
 import pandas as pd
 import streamlit as st
 import altair as alt
 import pydeck as pdk
 
+import data_cache
+
 st.set_page_config(layout="wide")
 st.title("Waternet Rivierkreeft Dashboard")
 
 # ----------------- Data inladen -----------------
-cray_csv = "data/RivierkreeftWaarnemingen_Cleaned.csv"
-wq_csv = "data/FYCHEM_Location_OverallStatus.csv"
-
-# ----- Crayfish -----
-dfc = pd.read_csv(cray_csv, engine="python")
-dfc.columns = [c.strip().lower() for c in dfc.columns]
-dfc = dfc.rename(columns={"lat": "latitude", "lon": "longitude", "lng": "longitude"})
-for col in ["aantal", "latitude", "longitude"]:
-    dfc[col] = pd.to_numeric(dfc[col], errors="coerce")
-# Convert date before any filtering
-dfc['datum'] = pd.to_datetime(dfc['datum'], errors='coerce')
-dfc['jaar'] = dfc['datum'].dt.year
-dfc['maand'] = dfc['datum'].dt.month
-
-# Create separate dataset for mapping (with coordinates only)
-dfc_map = dfc.dropna(subset=["latitude", "longitude"]).copy()
-
-# Aggregate near-duplicates (use mapping dataset)
-dfc_map["lat_round"] = dfc_map["latitude"].round(5)
-dfc_map["lon_round"] = dfc_map["longitude"].round(5)
-cray_agg = (
-    dfc_map.groupby(["locatie", "lat_round", "lon_round"], as_index=False)["aantal"]
-    .sum()
-    .rename(columns={"lat_round": "latitude", "lon_round": "longitude"})
-)
-cray_agg["type"] = "Crayfish"
-
-# ----- Water quality -----
-try:
-    dfw = pd.read_csv(wq_csv, engine="python")
-except Exception:
-    dfw = pd.read_csv(wq_csv, sep=";")
-dfw.columns = [c.strip().lower() for c in dfw.columns]
-dfw = dfw.rename(columns={
-    "wgs84_lat": "latitude",
-    "wgs84_lon": "longitude",
-    "overall_status_weighted": "status",
-})
-dfw["latitude"] = pd.to_numeric(dfw["latitude"], errors="coerce")
-dfw["longitude"] = pd.to_numeric(dfw["longitude"], errors="coerce")
-wq = dfw.dropna(subset=["latitude", "longitude"]).copy()
-wq["type"] = "Water quality"
+# Parsed once into data/cache/*.arrow and memory-mapped by every worker (see data_cache.py)
+dfc = data_cache.load("crayfish")
+cray_agg = data_cache.load("crayfish_agg")
+wq = data_cache.load("water_quality")
 
 # Status -> color
 def status_to_color(s):
@@ -61,7 +27,13 @@ def status_to_color(s):
         return [200, 0, 0, 220]
     return [160, 160, 160, 200]
 
-wq["color"] = wq["status"].apply(status_to_color)
+wq = wq.assign(color=wq["status"].apply(status_to_color))
+
+# Detected anomalies/exceedances per station (lookup, computed by station_anomalies.py)
+if os.path.exists(data_cache.EVENTS_CSV):
+    event_counts = data_cache.load("station_events")[["locatiecode", "events"]]
+    wq = wq.merge(event_counts, on="locatiecode", how="left")
+wq["events"] = wq.get("events", pd.Series(0, index=wq.index)).fillna(0).astype(int)
 
 # ----------------- Sidebar -----------------
 max_year = int(dfc['jaar'].max())
@@ -188,131 +160,70 @@ with tab3:
     deck = pdk.Deck(
         layers=[cray_heat, cray_points, cray_hover_hit, wq_points],
         initial_view_state=view,
-        tooltip={"text": "Locatie: {locatie}\nStatus: {status}"}
+        tooltip={"text": "Locatie: {locatie}\nStatus: {status}\nEvents: {events}"}
     )
 
     st.pydeck_chart(deck)
     st.caption("Legend — Water quality: OK = green, Potential stress = yellow, In danger = red")
 
 with tab4:
-    # add a graph using matplotlib 
-    import matplotlib.pyplot as plt
-    import pandas as pd
-    data = pd.read_csv('data/RivierkreeftWaarnemingen_Cleaned.csv', index_col=False)
-
-    # format
-    data['Datum'] = pd.to_datetime(data['Datum'])
-    ai_data = data.copy()
-    ai_data.drop(columns=['Locatie', 'Longitude', 'Latitude'], inplace=True)
-
-    # simplify to Aantal per month
-    ai_data = ai_data.set_index('Datum')['Aantal'].resample('M').sum().reset_index()
-
-    # take data from 2023 - 2025
-    recent_data = ai_data.loc[(ai_data['Datum'] >= '2023-01-01') & (ai_data['Datum'] <= '2025-09-30')]
-
-    # reformat Datum to YYYY-MM
-    recent_data['Datum'] = recent_data['Datum'].dt.to_period('M').astype(str)
-
-    # remove index
-    recent_data.reset_index(drop=True, inplace=True)
-
-    from prophet import Prophet
-    # Requires columns 'ds' (dates) and 'y' (values)
-
-    recent_data.rename(columns={'Datum': 'ds', 'Aantal': 'y'}, inplace=True)
-    recent_data['ds'] = pd.to_datetime(recent_data['ds'])
-    model = Prophet()
-    model.fit(recent_data)
-
-    future = model.make_future_dataframe(periods=12, freq='M')
-    forecast = model.predict(future)
-
-    fig = model.plot(forecast)
-    plt.show()
-    import pandas as pd
-    import matplotlib.pyplot as plt
-    from prophet import Prophet
     from datetime import datetime
 
-    # Your existing code
-    recent_data.rename(columns={'Datum': 'ds', 'Aantal': 'y'}, inplace=True)
-    recent_data['ds'] = pd.to_datetime(recent_data['ds'])
-    model = Prophet()
-    model.fit(recent_data)
-
-    future = model.make_future_dataframe(periods=12, freq='M')
-    forecast = model.predict(future)
-
-    # Custom plotting with your requirements
-    fig, ax = plt.subplots(figsize=(12, 6))
-
-    # Get today's date
-    today = datetime.now()
-
-    # start of last month
-    today = today.replace(day=1) - pd.DateOffset(days=1)
-
-
-    # Split forecast into historical and future
-    historical_mask = forecast['ds'] <= today
-    future_mask = forecast['ds'] > today
-
-    # Alternative: More customized version with better styling
-    fig, ax = plt.subplots(figsize=(14, 7))
-
-    # Plot with different colors for past and future
-    historical_forecast = forecast[forecast['ds'] <= today]
-    future_forecast = forecast[forecast['ds'] > today]
-
-    # Historical line (blue)
-    ax.plot(historical_forecast['ds'], historical_forecast['yhat'], 
-            color='#1f77b4', linewidth=2.5, label='Historical Forecast')
-
-    # Future line (red/orange)
-    ax.plot(future_forecast['ds'], future_forecast['yhat'], 
-            color='#ff7f0e', linewidth=2.5, label='Future Forecast')
-
-    # # Actual data points
-    # ax.scatter(recent_data['ds'], recent_data['y'], 
-    #            color='black', s=40, zorder=5, alpha=0.8, label='Actual Data')
-
-    # # Confidence intervals with different colors
-    # ax.fill_between(historical_forecast['ds'], 
-    #                 historical_forecast['yhat_lower'],
-    #                 historical_forecast['yhat_upper'],
-    #                 alpha=0.2, color='#1f77b4', label='Historical Confidence')
-
-    ax.fill_between(future_forecast['ds'], 
-                    future_forecast['yhat_lower'],
-                    future_forecast['yhat_upper'],
-                    alpha=0.2, color='#ff7f0e', label='Future Confidence')
-
-    # Today line
-    ax.axvline(x=today, color='red', linestyle='--', linewidth=2, alpha=0.8, label='Today')
-
-    # Set limits with no margins
-    ax.set_xlim(recent_data['ds'].min(), forecast['ds'].max())
-    y_min = min(forecast['yhat_lower'].min(), recent_data['y'].min())
-    y_max = max(forecast['yhat_upper'].max(), recent_data['y'].max())
-    ax.set_ylim(y_min - 2, y_max + 2)  # Small buffer for readability
-
-    # Styling
-    ax.set_xlabel('Date', fontsize=12)
-    ax.set_ylabel('Amount of Crayfish ', fontsize=12)
-    ax.set_title('Prophet Forecast: Historical (Blue) vs Future (Orange)', fontsize=14, fontweight='bold')
-    ax.legend(loc='upper left')
-    ax.grid(True, alpha=0.3)
-
-    # Remove margins completely
-    plt.margins(0)
-    plt.tight_layout()
-    st.pyplot(fig)
-
-    # Print future predictions
-    print("\nFuture Predictions:")
-    future_predictions = forecast[forecast['ds'] > today][['ds', 'yhat', 'yhat_lower', 'yhat_upper']].head(12)
-    print(future_predictions.to_string(index=False, float_format='%.1f'))
+    # Prophet is fitted once per data version by `python startup.py --prewarm`, never inside
+    # a request: Streamlit runs every tab on every rerun, so a cold cache would fit per worker.
+    # After a data/code update the previous forecast is shown until the next prewarm.
+    forecast, up_to_date = data_cache.load_built("crayfish_forecast")
+    if forecast is None:
+        st.info("De voorspelling is nog niet berekend. Draai `python startup.py --prewarm` "
+                "om hem te bouwen en herlaad daarna deze pagina.")
+    else:
+        if not up_to_date:
+            st.warning("Deze voorspelling is gemaakt met een oudere versie van de data. Draai "
+                       "`python startup.py --prewarm` om hem bij te werken.")
+
+        # Get today's date
+        today = datetime.now()
+
+        # start of last month
+        today = today.replace(day=1) - pd.DateOffset(days=1)
+
+        # Different colors for past and future
+        forecast = forecast.assign(
+            periode=forecast['ds'].le(today).map({True: 'Historical Forecast', False: 'Future Forecast'})
+        )
+        future_forecast = forecast[forecast['ds'] > today]
+
+        # No margins on x, small buffer on y for readability
+        y_min = float(min(forecast['yhat_lower'].min(), forecast['y'].min()))
+        y_max = float(max(forecast['yhat_upper'].max(), forecast['y'].max()))
+        x = alt.X("ds:T", title="Date", scale=alt.Scale(nice=False))
+
+        lines = alt.Chart(forecast).mark_line(strokeWidth=2.5).encode(
+            x=x,
+            y=alt.Y("yhat:Q", title="Amount of Crayfish", scale=alt.Scale(domain=[y_min - 2, y_max + 2])),
+            color=alt.Color("periode:N", title=None,
+                            scale=alt.Scale(domain=['Historical Forecast', 'Future Forecast'],
+                                            range=['#1f77b4', '#ff7f0e'])),
+            tooltip=[alt.Tooltip("ds:T", title="Date"), alt.Tooltip("yhat:Q", title="Forecast", format=".1f"),
+                     alt.Tooltip("y:Q", title="Observed")]
+        )
+        confidence = alt.Chart(future_forecast).mark_area(opacity=0.2, color='#ff7f0e').encode(
+            x=x, y="yhat_lower:Q", y2="yhat_upper:Q"
+        )
+        today_rule = alt.Chart(pd.DataFrame({"ds": [today]})).mark_rule(
+            color='red', strokeDash=[6, 4], strokeWidth=2, opacity=0.8
+        ).encode(x=x)
+
+        forecast_chart = (confidence + lines + today_rule).properties(
+            height=450,
+            title="Prophet Forecast: Historical (Blue) vs Future (Orange)"
+        )
+        st.altair_chart(forecast_chart, use_container_width=True)
+
+        # Print future predictions
+        print("\nFuture Predictions:")
+        future_predictions = future_forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].head(12)
+        print(future_predictions.to_string(index=False, float_format='%.1f'))
 
 with tab5:
     # How to prepare a crayfish
@@ -0,0 +1,302 @@
+# filename: data_api.py
+"""
+Small local HTTP API over the shared datasets, for notebooks and internal tools.
+
+Runs on the standard library only (asyncio), reading data through data_cache, so
+every client gets the same parsed, memory-mapped data the dashboard uses.
+
+Endpoints (GET/HEAD):
+    /datasets                          registered datasets and their data versions
+    /crayfish                          crayfish counts per location (map aggregate)
+    /water-quality                     water-quality status points
+    /stations?dataset=fychem           per (station, parameter): count, first, last
+    /series?dataset=fychem&station=NIJ003,GWV079&param=Zuurgraad
+                                       measurements as plotted by station_timeseries_viewers_plotly.py
+
+Common query parameters:
+    columns=a,b     return only these columns
+    start=, end=    datum range (inclusive, any pandas-parsable date)
+    format=         json (default), csv or arrow (Arrow IPC stream);
+                    `Accept: application/vnd.apache.arrow.stream` also selects arrow
+
+Responses carry an ETag derived from the data version and the request; a matching
+If-None-Match is answered with 304 before any data is touched. Bodies are gzipped
+when the client sends `Accept-Encoding: gzip`.
+
+Usage:
+    python data_api.py --port 8765
+    pd.read_csv('http://127.0.0.1:8765/series?dataset=fychem&station=NIJ003&param=Zuurgraad&format=csv')
+"""
+
+from __future__ import annotations
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import data_cache
+
+MEASUREMENT_DATASETS = ('fychem', 'hb')
+SERIES_COLUMNS = ['locatiecode', 'datum', 'fewsparameternaam', 'meetwaarde', 'eenheid']
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+MIN_GZIP_BYTES = 1024
+
+_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------- Query helpers ----------
+def _arg(query: dict, name: str, default=None):
+    values = query.get(name)
+    return values[-1] if values else default
+
+
+def _list_arg(query: dict, name: str):
+    value = _arg(query, name)
+    return [v.strip() for v in value.split(',') if v.strip()] if value else None
+
+
+def _measurement_dataset(query: dict) -> str:
+    name = _arg(query, 'dataset', 'fychem')
+    if name not in MEASUREMENT_DATASETS:
+        raise ApiError(400, f'dataset must be one of {", ".join(MEASUREMENT_DATASETS)}')
+    return name
+
+
+def _load(name: str) -> pd.DataFrame:
+    try:
+        return data_cache.load(name)
+    except FileNotFoundError as exc:
+        raise ApiError(404, str(exc)) from None
+
+
+def _apply_common(df: pd.DataFrame, query: dict) -> pd.DataFrame:
+    """Time-range and column selection shared by all table endpoints."""
+    start, end = _arg(query, 'start'), _arg(query, 'end')
+    if (start or end) and 'datum' not in df.columns:
+        raise ApiError(400, 'start/end given, but this dataset has no datum column')
+    if start or end:
+        try:
+            mask = pd.Series(True, index=df.index)
+            if start:
+                mask &= df['datum'] >= pd.Timestamp(start)
+            if end:
+                mask &= df['datum'] <= pd.Timestamp(end)
+        except ValueError as exc:
+            raise ApiError(400, f'invalid start/end: {exc}') from None
+        df = df.loc[mask]
+    columns = _list_arg(query, 'columns')
+    if columns:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise ApiError(400, f'unknown columns: {", ".join(missing)}')
+        df = df[columns]
+    return df
+
+
+# ---------- Endpoints: (datasets the result depends on, builder) ----------
+def _datasets(query):
+    return pd.DataFrame({
+        'dataset': list(data_cache.DATASETS),
+        'version': [data_cache.version(n) for n in data_cache.DATASETS],
+    })
+
+
+def _crayfish(query):
+    return _apply_common(_load('crayfish_agg'), query)
+
+
+def _water_quality(query):
+    return _apply_common(_load('water_quality'), query)
+
+
+def _stations(query):
+    df = _load(_measurement_dataset(query))
+    time_range = {k: v for k, v in query.items() if k in ('start', 'end')}
+    df = _apply_common(df[['locatiecode', 'fewsparameternaam', 'datum']], time_range)
+    out = (df.groupby(['locatiecode', 'fewsparameternaam'], observed=True)['datum']
+           .agg(['count', 'min', 'max'])
+           .rename(columns={'min': 'first', 'max': 'last'})
+           .reset_index())
+    return _apply_common(out, {k: v for k, v in query.items() if k == 'columns'})
+
+
+def _series(query):
+    df = _load(_measurement_dataset(query))
+    stations, params = _list_arg(query, 'station'), _list_arg(query, 'param')
+    if not stations:
+        raise ApiError(400, 'station is required (comma-separated for several)')
+    mask = df['locatiecode'].isin(stations)
+    if params:
+        mask &= df['fewsparameternaam'].isin(params)
+    d = df.loc[mask, [c for c in SERIES_COLUMNS if c in df.columns]]
+    d = _apply_common(d, query)
+    sort_cols = [c for c in ('locatiecode', 'fewsparameternaam', 'datum') if c in d.columns]
+    return d.sort_values(sort_cols, kind='stable') if sort_cols else d
+
+
+def _deps_measurement(query):
+    return [_arg(query, 'dataset', 'fychem')]
+
+
+ROUTES = {
+    '/datasets': (lambda q: list(data_cache.DATASETS), _datasets),
+    '/crayfish': (lambda q: ['crayfish_agg'], _crayfish),
+    '/water-quality': (lambda q: ['water_quality'], _water_quality),
+    '/stations': (_deps_measurement, _stations),
+    '/series': (_deps_measurement, _series),
+}
+
+
+# ---------- Serialization ----------
+def _format(query: dict, headers: dict) -> str:
+    fmt = _arg(query, 'format')
+    if fmt is None:
+        fmt = 'arrow' if ARROW_MIME in headers.get('accept', '') else 'json'
+    if fmt not in ('json', 'csv', 'arrow'):
+        raise ApiError(400, 'format must be json, csv or arrow')
+    return fmt
+
+
+def _serialize(df: pd.DataFrame, fmt: str) -> tuple[bytes, str]:
+    df = df.reset_index(drop=True)
+    if fmt == 'arrow':
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue(), ARROW_MIME
+    if fmt == 'csv':
+        return df.to_csv(index=False).encode('utf-8'), 'text/csv; charset=utf-8'
+    # float32 columns (compact meetwaarde) go through their shortest repr, so 9.296
+    # is written as 9.296 rather than the float64 widening 9.295999527.
+    narrow = [c for c in df.columns if df[c].dtype == 'float32']
+    if narrow:
+        df = df.assign(**{c: df[c].astype(str).astype('float64') for c in narrow})
+    return (df.to_json(orient='split', index=False, date_format='iso').encode('utf-8'),
+            'application/json')
+
+
+def _etag(path: str, query: dict, deps: list[str], fmt: str, gzipped: bool) -> str:
+    h = hashlib.sha1()
+    for name in deps:
+        h.update(f'{name}={data_cache.version(name) if name in data_cache.DATASETS else None};'.encode())
+    h.update(f'{path}?{sorted(query.items())}|{fmt}|{gzipped}'.encode())
+    return f'"{h.hexdigest()[:32]}"'
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored and * matches any tag."""
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return '*' in tags or etag in [t[2:] if t.startswith('W/') else t for t in tags]
+
+
+def build_response(method: str, target: str, headers: dict) -> tuple[int, dict, bytes]:
+    """Handle one request (runs in a worker thread); returns (status, headers, body)."""
+    url = urlsplit(target)
+    query = parse_qs(url.query)
+    if method not in ('GET', 'HEAD'):
+        raise ApiError(405, 'only GET and HEAD are supported')
+    if url.path not in ROUTES:
+        raise ApiError(404, f'unknown endpoint {url.path}; try /datasets')
+
+    deps, builder = ROUTES[url.path]
+    fmt = _format(query, headers)
+    gzipped = 'gzip' in headers.get('accept-encoding', '')
+    etag = _etag(url.path, query, deps(query), fmt, gzipped)
+    out_headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept, Accept-Encoding'}
+
+    if _etag_matches(etag, headers.get('if-none-match', '')):
+        return 304, out_headers, b''
+
+    body, content_type = _serialize(builder(query), fmt)
+    out_headers['Content-Type'] = content_type
+    if gzipped and len(body) >= MIN_GZIP_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        out_headers['Content-Encoding'] = 'gzip'
+    return 200, out_headers, body
+
+
+# ---------- Server ----------
+async def _read_request(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise ApiError(400, 'malformed request line') from None
+    headers = {}
+    while True:
+        raw = await reader.readline()
+        if raw in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = raw.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Serve requests on one connection (HTTP/1.1 keep-alive)."""
+    try:
+        while True:
+            keep_alive = False
+            method = 'GET'
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers = request
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                status, out_headers, body = await asyncio.to_thread(build_response, method, target, headers)
+            except ApiError as exc:
+                status, out_headers = exc.status, {'Content-Type': 'application/json'}
+                body = json.dumps({'error': str(exc)}).encode()
+            except Exception as exc:  # keep serving other requests
+                status, out_headers = 500, {'Content-Type': 'application/json'}
+                body = json.dumps({'error': f'{type(exc).__name__}: {exc}'}).encode()
+
+            out_headers['Content-Length'] = str(len(body))
+            out_headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+            head = f'HTTP/1.1 {status} {_REASONS.get(status, "")}\r\n' + ''.join(
+                f'{k}: {v}\r\n' for k, v in out_headers.items()) + '\r\n'
+            writer.write(head.encode('latin-1') + (b'' if method == 'HEAD' else body))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str = '127.0.0.1', port: int = 8765):
+    server = await asyncio.start_server(handle, host, port)
+    print(f'Serving data API on http://{host}:{port}/datasets')
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local HTTP API over the shared datasets.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
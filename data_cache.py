@@ -0,0 +1,369 @@
+# filename: data_cache.py
+"""
+Shared on-disk cache of parsed datasets for the dashboard.
+
+Every dataset is parsed once and materialized into an Arrow IPC file under
+`data/cache/`. Workers memory-map that file instead of re-parsing the CSV, so
+all Streamlit processes on a host share the same page-cache copy and a new
+worker only pays for opening a file.
+
+A cache file records the size and mtime of the source it was built from, plus a
+code version: a hash of the parse function's source, the modules it is registered
+with (e.g. measurement_schema.py) and the pandas/pyarrow versions. When either
+changes, the next `load()` rebuilds it: the new file is written next
+to the old one and swapped in with `os.replace`, so readers either see the old
+or the new file, never a partial one. Workers that still map the old file keep
+reading it until they reload.
+
+Exports:
+    - load(name, arrow_backed=False)   -> pd.DataFrame
+    - refresh(names=None)              -> list of rebuilt cache paths
+    - register(name, source, parse, code=())  (add a dataset to the registry)
+    - version(name)                    -> fingerprint, changes when the data or parsing code does
+    - is_cached(name)                  -> True when load() will not have to parse the source
+    - load_built(name)                 -> (last built frame or None, up_to_date), never parses
+
+Usage:
+    import data_cache
+    dfc = data_cache.load('crayfish')
+
+    # at deploy time / after a data drop:
+    python data_cache.py --refresh
+"""
+
+from __future__ import annotations
+import hashlib
+import inspect
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # cache disabled; load() falls back to parsing the source
+    pa = None
+
+CACHE_DIR = Path(os.environ.get('WATERNET_CACHE_DIR', 'data/cache'))
+
+CRAYFISH_CSV = 'data/RivierkreeftWaarnemingen_Cleaned.csv'
+WQ_STATUS_CSV = 'data/FYCHEM_Location_OverallStatus.csv'
+FYCHEM_CSV = 'data/waternet FEWS data/FYCHEM_alleParamtrs_alleJaren_Amstelland_1900tmjuni.csv'
+HB_CSV = 'data/waternet FEWS data/HB_alleKwalelementen_alleJaren_Amstelland.csv'
+EVENTS_CSV = 'data/station_events.csv'  # written by tutorials/scripts/station_anomalies.py
+
+SCRIPTS_DIR = Path(__file__).resolve().parent / 'tutorials' / 'scripts'
+
+_FINGERPRINT_KEY = b'waternet.source_fingerprint'
+
+# name -> (source path, parse function taking that path)
+DATASETS: dict[str, tuple[str, Callable[[str], pd.DataFrame]]] = {}
+
+# name -> extra source files the parse function depends on (part of the code version)
+_CODE_FILES: dict[str, tuple[Path, ...]] = {}
+_code_versions: dict[str, str] = {}  # computed once per process
+
+# (name, arrow_backed) -> (fingerprint, frame); avoids re-opening the file on every Streamlit rerun
+_loaded: dict[tuple[str, bool], tuple[str, pd.DataFrame]] = {}
+_load_lock = threading.Lock()  # one rebuild at a time per process (e.g. data_api.py threads)
+
+
+def register(name: str, source: str, parse: Callable[[str], pd.DataFrame], code=()) -> None:
+    """
+    Add (or replace) a dataset in the registry. `code` lists files the parse function
+    imports from; editing them (or `parse` itself) rebuilds the cache file.
+    """
+    DATASETS[name] = (source, parse)
+    _CODE_FILES[name] = tuple(Path(c) for c in code)
+    _code_versions.pop(name, None)
+    for key in [k for k in _loaded if k[0] == name]:
+        del _loaded[key]
+
+
+# ---------- Parsers ----------
+def parse_crayfish(path: str) -> pd.DataFrame:
+    """Crayfish sightings with lowercase columns, numeric counts/coords and year/month."""
+    dfc = pd.read_csv(path, engine="python")
+    dfc.columns = [c.strip().lower() for c in dfc.columns]
+    dfc = dfc.rename(columns={"lat": "latitude", "lon": "longitude", "lng": "longitude"})
+    for col in ["aantal", "latitude", "longitude"]:
+        dfc[col] = pd.to_numeric(dfc[col], errors="coerce")
+    dfc['datum'] = pd.to_datetime(dfc['datum'], errors='coerce')
+    dfc['jaar'] = dfc['datum'].dt.year
+    dfc['maand'] = dfc['datum'].dt.month
+    return dfc
+
+
+def parse_crayfish_agg(path: str) -> pd.DataFrame:
+    """Crayfish counts summed per location, near-duplicate coordinates merged."""
+    dfc_map = parse_crayfish(path).dropna(subset=["latitude", "longitude"])
+    dfc_map["lat_round"] = dfc_map["latitude"].round(5)
+    dfc_map["lon_round"] = dfc_map["longitude"].round(5)
+    cray_agg = (
+        dfc_map.groupby(["locatie", "lat_round", "lon_round"], as_index=False)["aantal"]
+        .sum()
+        .rename(columns={"lat_round": "latitude", "lon_round": "longitude"})
+    )
+    cray_agg["type"] = "Crayfish"
+    return cray_agg
+
+
+def parse_water_quality(path: str) -> pd.DataFrame:
+    """Water-quality status points with coordinates."""
+    try:
+        dfw = pd.read_csv(path, engine="python")
+    except Exception:
+        dfw = pd.read_csv(path, sep=";")
+    dfw.columns = [c.strip().lower() for c in dfw.columns]
+    dfw = dfw.rename(columns={
+        "wgs84_lat": "latitude",
+        "wgs84_lon": "longitude",
+        "overall_status_weighted": "status",
+    })
+    dfw["latitude"] = pd.to_numeric(dfw["latitude"], errors="coerce")
+    dfw["longitude"] = pd.to_numeric(dfw["longitude"], errors="coerce")
+    wq = dfw.dropna(subset=["latitude", "longitude"]).reset_index(drop=True)
+    wq["type"] = "Water quality"
+    return wq
+
+
+def parse_crayfish_forecast(path: str) -> pd.DataFrame:
+    """
+    Prophet forecast of monthly crayfish counts (2023-01 .. 2025-09, 12 months ahead).
+    Columns: ds, yhat, yhat_lower, yhat_upper, y (observed monthly total, NaN in the future).
+    """
+    from prophet import Prophet  # heavy (pulls in cmdstanpy); only needed to build the cache
+
+    data = pd.read_csv(path, index_col=False)
+    data['Datum'] = pd.to_datetime(data['Datum'])
+
+    # simplify to Aantal per month, keep 2023 - 2025, dates on the first of the month
+    monthly = data.set_index('Datum')['Aantal'].resample('ME').sum().reset_index()
+    recent = monthly.loc[(monthly['Datum'] >= '2023-01-01') & (monthly['Datum'] <= '2025-09-30')]
+    history = pd.DataFrame({
+        'ds': recent['Datum'].dt.to_period('M').dt.to_timestamp(),
+        'y': recent['Aantal'],
+    }).reset_index(drop=True)
+
+    model = Prophet()
+    model.fit(history)
+    future = model.make_future_dataframe(periods=12, freq='ME')
+    forecast = model.predict(future)[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+    return forecast.merge(history, on='ds', how='left')
+
+
+def parse_measurements(path: str) -> pd.DataFrame:
+    """FEWS measurement export (FYCHEM/HB) in the compact schema of measurement_schema.py."""
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.append(str(SCRIPTS_DIR))
+    from measurement_schema import read_measurements
+
+    return read_measurements(path)
+
+
+def parse_station_event_summary(path: str) -> pd.DataFrame:
+    """Per-station event counts from the station_anomalies.py events table (for the map)."""
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.append(str(SCRIPTS_DIR))
+    from station_anomalies import read_events, station_event_summary
+
+    return station_event_summary(read_events(path))
+
+
+register('crayfish', CRAYFISH_CSV, parse_crayfish)
+register('crayfish_agg', CRAYFISH_CSV, parse_crayfish_agg)
+register('crayfish_forecast', CRAYFISH_CSV, parse_crayfish_forecast)
+register('water_quality', WQ_STATUS_CSV, parse_water_quality)
+register('fychem', FYCHEM_CSV, parse_measurements, code=[SCRIPTS_DIR / 'measurement_schema.py'])
+register('hb', HB_CSV, parse_measurements, code=[SCRIPTS_DIR / 'measurement_schema.py'])
+register('station_events', EVENTS_CSV, parse_station_event_summary,
+         code=[SCRIPTS_DIR / 'station_anomalies.py', SCRIPTS_DIR / 'measurement_schema.py'])
+
+
+# ---------- Cache files ----------
+def cache_path(name: str) -> Path:
+    return CACHE_DIR / f'{name}.arrow'
+
+
+def _fingerprint(source: str) -> str | None:
+    """Cheap change marker for a source file (size + mtime), None if missing."""
+    try:
+        st = os.stat(source)
+    except FileNotFoundError:
+        return None
+    return f'{st.st_size}-{st.st_mtime_ns}'
+
+
+def _code_version(name: str) -> str:
+    """Hash of the parse function, its registered code files and the pandas/pyarrow versions."""
+    if name not in _code_versions:
+        _, parse = DATASETS[name]
+        h = hashlib.sha1(f'{pd.__version__}|{pa.__version__ if pa else None}'.encode())
+        try:
+            h.update(inspect.getsource(parse).encode())
+        except (OSError, TypeError):  # no source available (e.g. defined interactively)
+            h.update(f'{parse.__module__}.{parse.__qualname__}'.encode())
+        for path in _CODE_FILES.get(name, ()):
+            h.update(path.read_bytes() if path.exists() else b'')
+        _code_versions[name] = h.hexdigest()[:12]
+    return _code_versions[name]
+
+
+def _dataset_fingerprint(name: str) -> str | None:
+    """Source fingerprint + code version of dataset `name`, None if the source is missing."""
+    source, _ = DATASETS[name]
+    fingerprint = _fingerprint(source)
+    return None if fingerprint is None else f'{fingerprint}-{_code_version(name)}'
+
+
+def version(name: str) -> str | None:
+    """Current version of dataset `name` (source + code fingerprint), None if the source is missing."""
+    return _dataset_fingerprint(name)
+
+
+def _cached_fingerprint(path: Path) -> str | None:
+    """Fingerprint stored in an existing cache file, None if absent/unreadable."""
+    try:
+        with pa.memory_map(str(path), 'r') as source:
+            meta = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    value = meta.get(_FINGERPRINT_KEY)
+    return value.decode() if value is not None else None
+
+
+def materialize(name: str) -> Path:
+    """Parse the source of `name` and atomically (re)write its cache file."""
+    source, parse = DATASETS[name]
+    fingerprint = _dataset_fingerprint(name)
+    if fingerprint is None:
+        raise FileNotFoundError(f'Source for dataset "{name}" not found: {source}')
+
+    table = pa.Table.from_pandas(parse(source), preserve_index=False)
+    meta = dict(table.schema.metadata or {})
+    meta[_FINGERPRINT_KEY] = fingerprint.encode()
+    table = table.replace_schema_metadata(meta)
+
+    path = cache_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        with pa.OSFile(str(tmp), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return path
+
+
+def is_cached(name: str) -> bool:
+    """
+    True when load(name) can be served from memory or the cache file without
+    parsing the source, e.g. to avoid fitting the forecast inside a request.
+    """
+    fingerprint = _dataset_fingerprint(name)
+    if any(fingerprint is None or fp == fingerprint for key, (fp, _) in _loaded.items() if key[0] == name):
+        return True
+    if pa is None:
+        return False
+    cached = _cached_fingerprint(cache_path(name))
+    return cached is not None and (fingerprint is None or cached == fingerprint)
+
+
+def load_built(name: str) -> tuple[pd.DataFrame | None, bool]:
+    """
+    Last built version of `name`, never parsing the source: (frame, up_to_date).
+    (None, False) when no cache file exists yet. For datasets too expensive to build
+    inside a request (the Prophet forecast): show the old file, rebuild via --prewarm.
+    """
+    if is_cached(name):
+        return load(name), True
+    path = cache_path(name)
+    if pa is None or not path.exists():
+        return None, False
+    try:
+        table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None, False
+    return table.to_pandas(split_blocks=True), False
+
+
+def load(name: str, arrow_backed: bool = False) -> pd.DataFrame:
+    """
+    Return dataset `name`, rebuilding its cache file first if the source changed.
+
+    With arrow_backed=True the columns stay Arrow arrays on top of the memory map
+    (pd.ArrowDtype), so even string columns are shared between processes instead
+    of being copied into each worker. The default converts to regular NumPy-backed
+    columns, which is what the existing dashboard code expects.
+
+    The returned frame is shared between callers in this process; do not modify it
+    in place.
+    """
+    source, parse = DATASETS[name]
+    fingerprint = _dataset_fingerprint(name)
+
+    hit = _loaded.get((name, arrow_backed))
+    if hit is not None and (fingerprint is None or hit[0] == fingerprint):
+        return hit[1]
+
+    with _load_lock:
+        hit = _loaded.get((name, arrow_backed))
+        if hit is not None and (fingerprint is None or hit[0] == fingerprint):
+            return hit[1]
+
+        if pa is None:
+            df = parse(source)
+        else:
+            path = cache_path(name)
+            cached = _cached_fingerprint(path)
+            if cached is None or (fingerprint is not None and cached != fingerprint):
+                materialize(name)
+            table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+            if arrow_backed:
+                df = table.to_pandas(types_mapper=pd.ArrowDtype)
+            else:
+                df = table.to_pandas(split_blocks=True)
+
+        _loaded[(name, arrow_backed)] = (fingerprint, df)
+    return df
+
+
+def refresh(names=None) -> list[Path]:
+    """Rebuild the cache files for `names` (default: all registered datasets)."""
+    if pa is None:
+        raise ImportError('pyarrow is required to build the data cache')
+    return [materialize(name) for name in (names or list(DATASETS))]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the shared Arrow data cache.')
+    parser.add_argument('names', nargs='*', help='datasets to build (default: all)')
+    parser.add_argument('--refresh', action='store_true',
+                        help='rebuild even if the cache is up to date')
+    args = parser.parse_args()
+
+    failed = []
+    for name in args.names or list(DATASETS):
+        source, _ = DATASETS[name]
+        if _fingerprint(source) is None:
+            print(f'skip {name}: source not found ({source})', file=sys.stderr)
+            continue
+        try:
+            if args.refresh:
+                print(f'built {name} -> {materialize(name)}')
+            else:
+                load(name)
+                print(f'ok    {name} -> {cache_path(name)}')
+        except Exception as exc:  # report and continue with the other datasets
+            failed.append(name)
+            print(f'FAIL  {name}: {type(exc).__name__}: {exc}', file=sys.stderr)
+    if failed:
+        sys.exit(1)
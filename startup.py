@@ -0,0 +1,179 @@
+# filename: startup.py
+"""
+Startup budget check and deploy-time prewarm for the dashboard and viewer modules.
+
+Budget check (exit code 1 when a target is over budget or pulls in a heavy module):
+    python startup.py --check
+
+Prewarm (run once per deploy, before workers start):
+    python startup.py --prewarm
+
+Import time is measured in a fresh interpreter with `python -X importtime`, so the
+numbers include everything a cold worker pays before it can render anything. Script
+targets (`*.py`) are executed once end to end with Streamlit's AppTest, since
+Streamlit runs every tab body on every run: their time covers the imports *and* the
+script body, and imports made anywhere in the script count as startup imports. Each
+target also lists modules that must NOT be imported at startup; those are only
+allowed to load lazily inside the feature that needs them (Prophet/cmdstanpy when
+building the forecast cache, matplotlib/ipywidgets for the notebook viewers).
+Run --prewarm first; a cold data cache is not what the budget is about.
+"""
+
+from __future__ import annotations
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+SCRIPTS = ROOT / 'tutorials' / 'scripts'
+
+# Heavy modules that only specific features may load.
+HEAVY = ('prophet', 'cmdstanpy', 'matplotlib', 'ipywidgets', 'IPython')
+
+# target -> (modules imported / scripts run at startup, budget in ms, heavy modules allowed)
+BUDGETS = {
+    # one full run of the dashboard script, as a worker's first request
+    'app': (['app.py'], 6000, ()),
+    'station_timeseries_viewers': (['station_timeseries_viewers'], 800, ()),
+    'station_timeseries_viewers_plotly': (['station_timeseries_viewers_plotly'], 1500, ()),
+}
+
+# Scale all budgets for slower/faster machines, e.g. STARTUP_BUDGET_SCALE=2 on CI.
+BUDGET_SCALE = float(os.environ.get('STARTUP_BUDGET_SCALE', '1'))
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+_SCRIPT_MARKER = '-- startup.py: running scripts --'
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    paths = [str(ROOT), str(SCRIPTS)] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else [])
+    env['PYTHONPATH'] = os.pathsep.join(paths)
+    return env
+
+
+def _script_code(scripts: list[str]) -> str:
+    """Run each script once with AppTest and print the wall time (ms) of all runs."""
+    if not scripts:
+        return 'print(0.0)\n'
+    code = (
+        f'sys.stderr.write({_SCRIPT_MARKER!r} + "\\n")\n'
+        'sys.stderr.flush()\n'
+        'import time\n'
+        '_t0 = time.perf_counter()\n'
+        'from streamlit.testing.v1 import AppTest\n'
+    )
+    for script in scripts:
+        code += (
+            f'_at = AppTest.from_file({str(ROOT / script)!r}, default_timeout=600)\n'
+            '_at.run()\n'
+            'if _at.exception:\n'
+            f'    sys.exit({script!r} + " raised: " + _at.exception[0].message)\n'
+        )
+    return code + 'print((time.perf_counter() - _t0) * 1000)\n'
+
+
+def measure(modules: list[str]) -> tuple[float, list[str]]:
+    """
+    Import `modules` (and run the `*.py` scripts among them) in a fresh interpreter.
+    Returns (total time in ms, heavy modules that ended up in sys.modules).
+    """
+    scripts = [m for m in modules if m.endswith('.py')]
+    code = (
+        'import sys\n'
+        + ''.join(f'import {m}\n' for m in modules if m not in scripts)
+        + _script_code(scripts)
+        + f'print(",".join(m for m in {HEAVY!r} if m in sys.modules))\n'
+    )
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=ROOT, env=_env(), capture_output=True, text=True)
+    if proc.returncode != 0:
+        reason = (proc.stderr.strip().splitlines() or ['no output'])[-1]
+        raise RuntimeError(f'running {modules} failed: {reason}\n{proc.stderr[-2000:]}')
+
+    # Top-level entries (no indentation before the name) carry the cumulative time.
+    # Imports after the marker happen inside the script runs, which are timed whole.
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if line == _SCRIPT_MARKER:
+            break
+        m = _IMPORTTIME_RE.match(line)
+        if m and m.group(3) == ' ':
+            total_us += int(m.group(2))
+    script_ms, heavy = (proc.stdout.strip().splitlines() + [''])[-2:]
+    loaded = [m for m in heavy.split(',') if m]
+    return total_us / 1000.0 + float(script_ms), loaded
+
+
+def check(targets=None) -> bool:
+    """Print a budget report; True when every target is within budget."""
+    ok = True
+    for name in targets or list(BUDGETS):
+        modules, budget_ms, allowed = BUDGETS[name]
+        budget_ms *= BUDGET_SCALE
+        try:
+            elapsed_ms, loaded = measure(modules)
+        except RuntimeError as exc:
+            print(f'FAIL  {name:36} {str(exc).splitlines()[0]}')
+            ok = False
+            continue
+        leaked = [m for m in loaded if m not in allowed]
+        status = 'ok' if elapsed_ms <= budget_ms and not leaked else 'FAIL'
+        ok &= status == 'ok'
+        line = f'{status:4}  {name:36} {elapsed_ms:8.0f} ms  (budget {budget_ms:.0f} ms)'
+        if leaked:
+            line += f'  heavy imports at startup: {", ".join(leaked)}'
+        print(line)
+    return ok
+
+
+def prewarm() -> None:
+    """
+    Do the expensive one-off work before the first request:
+    build the shared data cache (incl. the Prophet forecast) and byte-compile sources.
+    """
+    import compileall
+
+    os.chdir(ROOT)
+    sys.path[:0] = [str(ROOT), str(SCRIPTS)]
+    import data_cache
+
+    for name in data_cache.DATASETS:
+        source, _ = data_cache.DATASETS[name]
+        if not Path(source).exists():
+            print(f'skip {name}: source not found ({source})')
+            continue
+        try:
+            data_cache.load(name)
+        except Exception as exc:  # one bad dataset must not stop the rest of the prewarm
+            print(f'FAIL {name}: {type(exc).__name__}: {exc}')
+            continue
+        print(f'cached {name} -> {data_cache.cache_path(name)}')
+
+    compileall.compile_dir(str(ROOT), quiet=1, rx=re.compile(r'[\\/](\.git|data|docs)[\\/]'))
+
+    # Warm the OS page cache / .pyc files of the modules workers import at startup.
+    for name, (modules, _, _) in BUDGETS.items():
+        try:
+            measure(modules)
+        except RuntimeError as exc:
+            print(f'skip warming {name}: {str(exc).splitlines()[0]}')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--check', action='store_true', help='measure import time against the budgets')
+    parser.add_argument('--prewarm', action='store_true', help='build caches before workers start')
+    parser.add_argument('targets', nargs='*', help=f'subset of {list(BUDGETS)} for --check')
+    args = parser.parse_args()
+
+    if not (args.check or args.prewarm):
+        parser.error('pass --check and/or --prewarm')
+    if args.prewarm:
+        prewarm()
+    if args.check and not check(args.targets):
+        sys.exit(1)
@@ -0,0 +1,228 @@
+# filename: export_station_figures.py
+"""
+Batch export of per-station time-series figures for the monthly report.
+
+For every selected (station, parameter) series a Plotly figure is written as HTML
+(and optionally PNG, needs `kaleido`), plus an `index.html` that links them all.
+
+The measurement table is read and grouped once in the parent process. Each worker
+task only receives the arrays of its own series, so the full table is never
+pickled to the process pool. Every output is tagged with a content hash of its
+series and render settings (kept in `manifest.json`); unchanged series are skipped
+on the next run. `index.html` is built from the whole manifest, so a partial re-run
+(e.g. `--stations GWV079`) still links every series already in `out_dir`.
+
+Usage:
+    python export_station_figures.py "data/waternet FEWS data/FYCHEM_alleParamtrs_alleJaren_Amstelland_1900tmjuni.csv" \\
+        --out reports/2025-09 --stations all --params "Zuurgraad,Temperatuur (oC)" --workers 8 --png
+
+Exports:
+    - group_series(df, stations='all', params='all') -> dict[(station, param)] -> (datum, meetwaarde, unit)
+    - export_figures(df, out_dir, stations='all', params='all', max_gap_days=180, png=False, workers=None)
+"""
+
+from __future__ import annotations
+import hashlib
+import html
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from measurement_schema import MEASUREMENT_COLUMNS, read_measurements, to_compact
+except ImportError:  # imported as scripts.<module> from the tutorials folder
+    from .measurement_schema import MEASUREMENT_COLUMNS, read_measurements, to_compact
+
+# Bump when the figure layout changes, so every output is re-rendered once.
+RENDER_VERSION = '1'
+MANIFEST = 'manifest.json'
+
+
+# ---------- Grouping ----------
+def _selection(selected):
+    if selected is None or selected == 'all':
+        return None
+    if isinstance(selected, str):
+        selected = [s.strip() for s in selected.split(',') if s.strip()]
+    return list(selected)
+
+
+def group_series(df: pd.DataFrame, stations='all', params='all') -> dict:
+    """
+    Split the measurement table into per-(station, parameter) arrays, sorted by date.
+    `stations`/`params` are 'all', a list or a comma-separated string.
+    """
+    dfx = to_compact(df)
+    st_sel = _selection(stations)
+    pa_sel = _selection(params)
+
+    mask = dfx['datum'].notna()
+    if st_sel is not None:
+        mask &= dfx['locatiecode'].isin(st_sel)
+    if pa_sel is not None:
+        mask &= dfx['fewsparameternaam'].isin(pa_sel)
+    d = dfx.loc[mask, ['locatiecode', 'fewsparameternaam', 'datum', 'meetwaarde', 'eenheid']]
+    d = d.sort_values(['locatiecode', 'fewsparameternaam', 'datum'], kind='stable')
+
+    series = {}
+    for (station, param), g in d.groupby(['locatiecode', 'fewsparameternaam'], observed=True, sort=False):
+        units = g['eenheid'].dropna()
+        unit = str(units.iloc[0]) if not units.empty else ''
+        series[(str(station), str(param))] = (
+            g['datum'].to_numpy(), g['meetwaarde'].to_numpy(), unit
+        )
+    return series
+
+
+def _content_hash(datum: np.ndarray, values: np.ndarray, unit: str, settings: str) -> str:
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(datum).view('int64').tobytes())
+    h.update(np.ascontiguousarray(values).tobytes())
+    h.update(f'{unit}\x00{settings}'.encode())
+    return h.hexdigest()
+
+
+def _slug(station: str, param: str) -> str:
+    """Readable file name plus a short hash, so e.g. 'Temperatuur (oC)' and 'Temperatuur oC' don't collide."""
+    readable = re.sub(r'[^A-Za-z0-9._-]+', '_', f'{station}__{param}').strip('_')
+    key = hashlib.sha1(f'{station}\x00{param}'.encode()).hexdigest()[:8]
+    return f'{readable}_{key}'
+
+
+def _read_manifest(path: Path) -> dict:
+    """slug -> {'station', 'param', 'hash', 'png'}; entries in an older format are dropped."""
+    if not path.exists():
+        return {}
+    return {slug: entry for slug, entry in json.loads(path.read_text()).items() if isinstance(entry, dict)}
+
+
+# ---------- Worker ----------
+def _render(task) -> tuple[str, str, str | None]:
+    """
+    Render one series; runs in a worker process. Returns (station, param, error),
+    error None on success, so one bad series doesn't abort the whole run.
+    """
+    station, param, datum, values, unit, max_gap_days, html_path, png_path = task
+    try:
+        try:
+            from station_timeseries_viewers_plotly import make_plotly_station_timeseries
+        except ImportError:
+            from .station_timeseries_viewers_plotly import make_plotly_station_timeseries
+
+        d = pd.DataFrame({
+            'locatiecode': station, 'fewsparameternaam': param,
+            'datum': datum, 'meetwaarde': values, 'eenheid': unit or None,
+        })
+        fig = make_plotly_station_timeseries(d, station, param, max_gap_days=max_gap_days)
+        fig.write_html(html_path, include_plotlyjs='cdn', full_html=True)
+        if png_path:
+            fig.write_image(png_path, width=1200, height=500)  # needs kaleido
+    except Exception as exc:
+        return station, param, f"{type(exc).__name__}: {' '.join(str(exc).split())}"
+    return station, param, None
+
+
+# ---------- Index page ----------
+def _write_index(out_dir: Path, manifest: dict) -> Path:
+    """Index of every series in the manifest whose HTML is present in `out_dir`."""
+    entries = sorted(
+        (e['station'], e['param'], slug, e['png'] and (out_dir / f'{slug}.png').exists())
+        for slug, e in manifest.items() if (out_dir / f'{slug}.html').exists()
+    )
+    rows, current = [], None
+    for station, param, slug, has_png in entries:
+        if station != current:
+            rows.append(f'<h2>{html.escape(station)}</h2>')
+            current = station
+        link = f'<a href="{slug}.html">{html.escape(param)}</a>'
+        if has_png:
+            link += f' (<a href="{slug}.png">png</a>)'
+        rows.append(f'<li>{link}</li>')
+    path = out_dir / 'index.html'
+    path.write_text(
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Station time series</title></head>\n'
+        '<body><h1>Station time series</h1>\n' + '\n'.join(rows) + '\n</body></html>\n',
+        encoding='utf-8',
+    )
+    return path
+
+
+def export_figures(df: pd.DataFrame, out_dir, stations='all', params='all', max_gap_days: int = 180,
+                   png: bool = False, workers: int | None = None, force: bool = False) -> dict:
+    """
+    Render all selected series to `out_dir` in parallel and write `index.html`.
+    Series that fail to render are reported and left out of the manifest (so they
+    are retried next run); everything that did render is recorded.
+    Returns {'rendered': n, 'skipped': n, 'failed': n, 'total': n, 'errors': {(station, param): msg}}.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST
+    manifest = _read_manifest(manifest_path)
+
+    settings = f'v{RENDER_VERSION}|gap={max_gap_days}|png={png}'
+    series = group_series(df, stations, params)
+
+    tasks, new_manifest = [], {}
+    for (station, param), (datum, values, unit) in sorted(series.items()):
+        slug = _slug(station, param)
+        html_path, png_path = out_dir / f'{slug}.html', out_dir / f'{slug}.png'
+        digest = _content_hash(datum, values, unit, settings)
+        new_manifest[slug] = {'station': station, 'param': param, 'hash': digest, 'png': png}
+        up_to_date = (not force and manifest.get(slug, {}).get('hash') == digest
+                      and html_path.exists() and (not png or png_path.exists()))
+        if not up_to_date:
+            tasks.append((station, param, datum, values, unit, max_gap_days,
+                          str(html_path), str(png_path) if png else None))
+
+    results = []
+    if tasks:
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(tasks) == 1:
+            results = [_render(t) for t in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunksize = max(1, len(tasks) // (workers * 4))
+                results = list(pool.map(_render, tasks, chunksize=chunksize))
+
+    errors = {(station, param): error for station, param, error in results if error is not None}
+    for station, param in errors:
+        del new_manifest[_slug(station, param)]  # keep the previous entry, if any
+
+    manifest.update(new_manifest)
+    manifest_path.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    _write_index(out_dir, manifest)
+    total = len(series)
+    return {'rendered': len(tasks) - len(errors), 'skipped': total - len(tasks), 'failed': len(errors),
+            'total': total, 'errors': errors}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Export per-station time-series figures.')
+    parser.add_argument('csv', help='FEWS measurement export (;-separated, latin-1)')
+    parser.add_argument('--out', required=True, help='output directory')
+    parser.add_argument('--stations', default='all', help='"all" or comma-separated location codes')
+    parser.add_argument('--params', default='all', help='"all" or comma-separated fewsparameternaam values')
+    parser.add_argument('--max-gap-days', type=int, default=180)
+    parser.add_argument('--png', action='store_true', help='also write PNGs (requires kaleido)')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: all cores)')
+    parser.add_argument('--force', action='store_true', help='re-render unchanged series too')
+    args = parser.parse_args()
+
+    table = read_measurements(args.csv, usecols=lambda c: c in MEASUREMENT_COLUMNS)
+    counts = export_figures(table, args.out, stations=args.stations, params=args.params,
+                            max_gap_days=args.max_gap_days, png=args.png,
+                            workers=args.workers, force=args.force)
+    for (station, param), error in counts['errors'].items():
+        print(f'FAIL  {station} / {param}: {error}')
+    print(f"{counts['rendered']} rendered, {counts['skipped']} unchanged, {counts['failed']} failed, "
+          f"index: {Path(args.out) / 'index.html'}")
+    if counts['failed']:
+        raise SystemExit(1)
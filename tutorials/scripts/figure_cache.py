@@ -0,0 +1,178 @@
+# filename: figure_cache.py
+"""
+Bounded LRU cache of serialized Plotly figures.
+
+Flipping back to a station/parameter combination should not redo filtering, gap
+breaking and trace construction. Figures are stored as their JSON, keyed on the
+builder, its arguments and the data version, and evicted least-recently-used
+once the total JSON size exceeds `max_bytes`.
+
+Exports:
+    - FigureCache(max_bytes=64 MB)
+        .figure(builder, df, *args, **kwargs) -> go.Figure (built once per key)
+        .json(builder, df, *args, **kwargs)   -> figure JSON string (no Figure rebuild)
+        .show(builder, df, *args, **kwargs)   -> show the cached JSON via the plotly renderer
+        .stats()                              -> hits, misses, evictions, entries, bytes
+        .clear()
+    - data_version(df)   -> content hash of a measurement frame, computed once per frame
+    - events_version(events) -> content hash of an index_events() mapping, once per mapping
+    - FIGURE_CACHE       -> shared default instance used by the Plotly viewers
+
+Usage:
+    from figure_cache import FIGURE_CACHE
+    from station_timeseries_viewers_plotly import make_plotly_timeseries
+
+    fig = FIGURE_CACHE.figure(make_plotly_timeseries, df, 'NIJ003', 'GWV079', 'Zuurgraad', max_gap_days=180)
+    FIGURE_CACHE.stats()
+"""
+
+from __future__ import annotations
+import hashlib
+import inspect
+import json
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+# id(obj) -> (weakref to obj, version); entries disappear when the object is garbage collected
+_versions: dict[int, tuple[weakref.ref, str]] = {}
+
+_VERSION_COLUMNS = ['locatiecode', 'datum', 'fewsparameternaam', 'meetwaarde', 'eenheid']
+
+
+def _remembered(obj) -> str | None:
+    entry = _versions.get(id(obj))
+    return entry[1] if entry is not None and entry[0]() is obj else None
+
+
+def _remember(obj, version: str) -> str:
+    key = id(obj)
+    try:
+        ref = weakref.ref(obj, lambda _, key=key: _versions.pop(key, None))
+    except TypeError:  # not weak-referenceable (e.g. a plain dict): hashed on every call
+        return version
+    _versions[key] = (ref, version)
+    return version
+
+
+def _hash_frame(h, df: pd.DataFrame):
+    h.update(repr((len(df), list(df.columns))).encode())
+    if len(df):
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+
+def data_version(df: pd.DataFrame) -> str:
+    """
+    Content hash of the columns the figure builders read. Hashed once per frame
+    object (O(rows)); later calls for the same frame are a dictionary lookup.
+    Frames are treated as immutable: modify in place and the version is stale.
+    """
+    version = _remembered(df)
+    if version is None:
+        h = hashlib.sha1()
+        _hash_frame(h, df[[c for c in _VERSION_COLUMNS if c in df.columns]])
+        version = _remember(df, h.hexdigest())
+    return version
+
+
+def events_version(events) -> str | None:
+    """
+    Content hash of an index_events() mapping (every event row, not just counts).
+    Hashed once per mapping object when it is weak-referenceable, as the
+    station_anomalies.EventIndex returned by index_events() is; same immutability
+    caveat as data_version().
+    """
+    if not events:
+        return None
+    version = _remembered(events)
+    if version is None:
+        h = hashlib.sha1()
+        for key in sorted(events):
+            h.update(repr(key).encode())
+            _hash_frame(h, events[key])
+        version = _remember(events, h.hexdigest())
+    return version
+
+
+class FigureCache:
+    """LRU cache of figure JSON, bounded by total JSON size in bytes."""
+
+    def __init__(self, max_bytes: int = 64 * 2**20):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def _key(self, builder, df, args, kwargs):
+        # Bind against the signature so positional, keyword and default arguments
+        # of the same call map to the same key.
+        bound = inspect.signature(builder).bind(df, *args, **kwargs)
+        bound.apply_defaults()
+        params = dict(list(bound.arguments.items())[1:])
+        events = params.pop('events', None)
+        return (builder.__module__, builder.__qualname__, data_version(df),
+                tuple(params.items()), events_version(events))
+
+    def json(self, builder, df: pd.DataFrame, *args, **kwargs) -> str:
+        """Figure JSON for builder(df, *args, **kwargs), building it on a miss."""
+        key = self._key(builder, df, args, kwargs)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        payload = builder(df, *args, **kwargs).to_json()
+        size = len(payload)
+        with self._lock:
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = payload
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, old = self._entries.popitem(last=False)
+                    self._bytes -= len(old)
+                    self.evictions += 1
+        return payload
+
+    def figure(self, builder, df: pd.DataFrame, *args, **kwargs):
+        """
+        Like json(), but returns a fresh go.Figure the caller may modify. Rebuilding
+        the Figure from JSON costs milliseconds; to only display it, use show().
+        """
+        return pio.from_json(self.json(builder, df, *args, **kwargs), skip_invalid=True)
+
+    def show(self, builder, df: pd.DataFrame, *args, **kwargs):
+        """
+        Show the figure straight from the cached JSON (no go.Figure), through
+        plotly's configured renderer, so Colab/classic Notebook work as with fig.show().
+        """
+        pio.show(json.loads(self.json(builder, df, *args, **kwargs)), validate=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else np.nan,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+
+FIGURE_CACHE = FigureCache()
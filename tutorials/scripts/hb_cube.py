@@ -0,0 +1,191 @@
+# filename: hb_cube.py
+"""
+Sparse species x location x year abundance cube for the hydrobiology (HB) export.
+
+The HB table is scanned once; after that slicing, presence/absence queries and
+diversity indices run on a scipy CSR matrix instead of re-grouping millions of rows.
+
+Layout: rows are species, columns are (location, year) cells, column index =
+location_index * n_years + year_index. Values are summed `meetwaarde` per cell
+(records without a value count as 1, i.e. presence).
+
+The export mixes many `fewsparametercode`s per taxon (cover %, Tansley scale,
+counts, grams, counts per ha, ...), which cannot be added up. Summing values
+therefore needs a single parameter (`param=`); without one the cube counts
+records, i.e. presence.
+
+Exports:
+    - HBCube.from_frame(df, param=None, value_col='meetwaarde', ...)
+    - cube.slice(species=None, locations=None, years=None) -> HBCube
+    - cube.abundance(species)            -> location x year DataFrame
+    - cube.presence(species)             -> location x year bool DataFrame
+    - cube.occupancy(species)            -> locations with the species per year
+    - cube.richness() / cube.shannon() / cube.simpson() -> location x year DataFrames
+    - cube.to_frame()                    -> long table of non-zero cells
+
+Usage:
+    from measurement_schema import read_measurements
+    from hb_cube import HBCube
+
+    hb = read_measurements(path / 'data/waternet FEWS data/HB_alleKwalelementen_alleJaren_Amstelland.csv')
+    counts = HBCube.from_frame(hb, param='VSLC_n')       # abundance = summed counts
+    counts.slice(years=range(2015, 2025)).shannon()
+    presence = HBCube.from_frame(hb)                      # any parameter, records counted
+    presence.occupancy('Rode Amerikaanse rivierkreeft')
+"""
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+try:
+    from measurement_schema import to_compact
+except ImportError:  # imported as scripts.<module> from the tutorials folder
+    from .measurement_schema import to_compact
+
+SPECIES_COL = 'WNA nederlandse soortnaam'
+PARAM_COL = 'fewsparametercode'
+
+
+class HBCube:
+    """Species x (location, year) sparse abundance matrix with labelled axes."""
+
+    def __init__(self, matrix: sparse.csr_matrix, species: pd.Index, locations: pd.Index, years: pd.Index,
+                 param: str | None = None):
+        self.matrix = matrix.tocsr()
+        self.species = species
+        self.locations = locations
+        self.years = years
+        self.param = param  # parameter code the values are in; None = record counts
+
+    # ---------- Construction ----------
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, param: str | None = None, species_col: str = SPECIES_COL,
+                   location_col: str = 'locatiecode', value_col: str | None = 'meetwaarde',
+                   date_col: str = 'datum', param_col: str = PARAM_COL) -> 'HBCube':
+        """
+        Build the cube in one pass over `df`. Filter `df` first to restrict it to a
+        quality element, length class, etc.
+
+        `param` selects one `fewsparametercode` (e.g. 'VSLC_n') whose `value_col` is
+        summed per cell. Without `param` records are counted (presence), since values
+        of different parameters are not comparable; `value_col=None` always counts.
+        """
+        d = to_compact(df)
+        mask = d[species_col].notna() & d[location_col].notna() & d[date_col].notna()
+        if param is not None:
+            if param_col not in d.columns:
+                raise KeyError(f'Column {param_col!r} not in frame; cannot select param={param!r}')
+            mask &= d[param_col] == param
+            if not mask.any():
+                raise ValueError(f'No records with {param_col} == {param!r}')
+        else:
+            value_col = None
+        d = d.loc[mask]
+
+        sp_codes, species = pd.factorize(d[species_col], sort=True)
+        loc_codes, locations = pd.factorize(d[location_col], sort=True)
+        yr_codes, years = pd.factorize(d[date_col].dt.year, sort=True)
+
+        if value_col is None:
+            values = np.ones(len(d))
+        else:
+            values = pd.to_numeric(d[value_col], errors='coerce').fillna(1.0).to_numpy(dtype='float64')
+
+        n_years = len(years)
+        cols = loc_codes.astype(np.int64) * n_years + yr_codes
+        matrix = sparse.coo_matrix((values, (sp_codes, cols)),
+                                   shape=(len(species), len(locations) * n_years)).tocsr()
+        matrix.sum_duplicates()
+        return cls(matrix, pd.Index(species.astype(str), name='species'),
+                   pd.Index(locations.astype(str), name='locatiecode'),
+                   pd.Index(years.astype(int), name='jaar'),
+                   param=param if value_col is not None else None)
+
+    # ---------- Slicing ----------
+    def _cols(self, loc_pos: np.ndarray, yr_pos: np.ndarray) -> np.ndarray:
+        return (loc_pos[:, None] * len(self.years) + yr_pos[None, :]).ravel()
+
+    @staticmethod
+    def _positions(index: pd.Index, labels) -> np.ndarray:
+        if labels is None:
+            return np.arange(len(index))
+        if isinstance(labels, (str, int, np.integer)):
+            labels = [labels]
+        pos = index.get_indexer(pd.Index(list(labels)).astype(index.dtype))
+        return pos[pos >= 0]
+
+    def slice(self, species=None, locations=None, years=None) -> 'HBCube':
+        """Sub-cube for the given species/locations/years (labels; unknown labels are ignored)."""
+        sp = self._positions(self.species, species)
+        loc = self._positions(self.locations, locations)
+        yr = self._positions(self.years, years)
+        matrix = self.matrix[sp][:, self._cols(loc, yr)]
+        return HBCube(matrix, self.species[sp], self.locations[loc], self.years[yr], param=self.param)
+
+    def _grid(self, values: np.ndarray) -> pd.DataFrame:
+        """Reshape a per-column vector into a location x year frame."""
+        return pd.DataFrame(np.asarray(values).reshape(len(self.locations), len(self.years)),
+                            index=self.locations, columns=self.years)
+
+    # ---------- Queries ----------
+    def abundance(self, species: str) -> pd.DataFrame:
+        """Summed abundance of one species per location and year."""
+        pos = self.species.get_loc(species)
+        return self._grid(self.matrix[pos].toarray().ravel())
+
+    def presence(self, species: str) -> pd.DataFrame:
+        """True where the species was recorded (location x year)."""
+        return self.abundance(species) > 0
+
+    def occupancy(self, species: str) -> pd.Series:
+        """Number of locations where the species was recorded, per year."""
+        return self.presence(species).sum(axis=0).rename('locations')
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long table (species, locatiecode, jaar, abundance) of all non-zero cells."""
+        coo = self.matrix.tocoo()
+        n_years = len(self.years)
+        return pd.DataFrame({
+            'species': self.species[coo.row],
+            'locatiecode': self.locations[coo.col // n_years],
+            'jaar': self.years[coo.col % n_years],
+            'abundance': coo.data,
+        })
+
+    # ---------- Diversity (vectorized over all location/year cells) ----------
+    def richness(self) -> pd.DataFrame:
+        """Number of species per location and year."""
+        present = self.matrix.copy()
+        present.data = (present.data > 0).astype('float64')
+        return self._grid(np.asarray(present.sum(axis=0)).ravel())
+
+    def _proportions(self):
+        """(column index, p) for every non-zero entry, p = share of the cell total."""
+        coo = self.matrix.tocoo()
+        totals = np.asarray(self.matrix.sum(axis=0)).ravel()
+        keep = coo.data > 0
+        col = coo.col[keep]
+        return col, coo.data[keep] / totals[col]
+
+    def shannon(self) -> pd.DataFrame:
+        """Shannon index H = -sum(p ln p) per location and year (NaN for empty cells)."""
+        col, p = self._proportions()
+        n_cells = self.matrix.shape[1]
+        h = np.bincount(col, weights=-p * np.log(p), minlength=n_cells)
+        h[np.bincount(col, minlength=n_cells) == 0] = np.nan
+        return self._grid(h)
+
+    def simpson(self) -> pd.DataFrame:
+        """Gini-Simpson index 1 - sum(p^2) per location and year (NaN for empty cells)."""
+        col, p = self._proportions()
+        n_cells = self.matrix.shape[1]
+        d = 1.0 - np.bincount(col, weights=p * p, minlength=n_cells)
+        d[np.bincount(col, minlength=n_cells) == 0] = np.nan
+        return self._grid(d)
+
+    def __repr__(self) -> str:
+        values = self.param if self.param is not None else 'record counts'
+        return (f'HBCube({len(self.species)} species x {len(self.locations)} locations x '
+                f'{len(self.years)} years, {self.matrix.nnz} non-zero cells, values: {values})')
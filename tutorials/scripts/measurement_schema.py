@@ -0,0 +1,137 @@
+# filename: measurement_schema.py
+"""
+Compact in-memory schema for FEWS measurement tables (FYCHEM / HB).
+
+The raw export repeats the same few hundred location codes, parameter names and
+units as Python strings on every row. The canonical compact schema stores them
+dictionary-encoded and narrows the numeric columns:
+
+    locatiecode        category
+    fewsparameternaam  category
+    fewsparametercode  category
+    eenheid            category
+    datum              datetime64[s]
+    meetwaarde         float32 (stays float64 if float32 would lose precision)
+
+Other text columns become category when they are repetitive (< 50% distinct) and
+other integer columns (e.g. RD `locatie x`/`locatie y`) are downcast to the smallest
+integer type that holds them.
+Columns that are missing from the frame are simply skipped.
+
+Exports:
+    - to_compact(df)                     -> compact DataFrame (no copy if already compact)
+    - is_compact(df)                     -> bool
+    - read_measurements(path, sep=';', usecols=None) -> compact DataFrame
+    - memory_report(df, baseline=None)   -> per-column memory usage
+
+Usage:
+    from measurement_schema import read_measurements, memory_report
+
+    df = read_measurements('data/waternet FEWS data/FYCHEM_alleParamtrs_alleJaren_Amstelland_1900tmjuni.csv')
+    display(memory_report(df))
+"""
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLUMNS = ['locatiecode', 'fewsparameternaam', 'fewsparametercode', 'eenheid']
+DATE_COLUMN = 'datum'
+VALUE_COLUMN = 'meetwaarde'
+DATE_DTYPE = 'datetime64[s]'
+
+# Columns the viewers need; handy as `usecols` when the rest of the export is not used.
+MEASUREMENT_COLUMNS = ['locatiecode', 'datum', 'fewsparameternaam', 'fewsparametercode',
+                       'meetwaarde', 'eenheid']
+
+# Repetitive text columns (distinct/rows below this) are dictionary-encoded too.
+_AUTO_CATEGORY_RATIO = 0.5
+
+
+def _is_text(s: pd.Series) -> bool:
+    return s.dtype == object or pd.api.types.is_string_dtype(s.dtype)
+
+
+def _compact_values(s: pd.Series) -> pd.Series:
+    """
+    Numeric float32 if the shortest float32 repr of every value reads back as the
+    same float64 (e.g. 9.296, 0.1), else float64 (e.g. 16777217, 123456.789).
+    """
+    v = pd.to_numeric(s, errors='coerce').astype('float64')
+    # Checked on distinct values only; measurement columns repeat a limited set of readings.
+    distinct = np.unique(v.to_numpy())
+    distinct = distinct[~np.isnan(distinct)]
+    with np.errstate(over='ignore'):
+        back = distinct.astype('float32').astype(str).astype('float64')
+    return v.astype('float32') if np.array_equal(back, distinct) else v
+
+
+def is_compact(df: pd.DataFrame) -> bool:
+    """True when every canonical column present in `df` already has its compact dtype."""
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            return False
+    if DATE_COLUMN in df.columns and df[DATE_COLUMN].dtype != np.dtype(DATE_DTYPE):
+        return False
+    if VALUE_COLUMN in df.columns and df[VALUE_COLUMN].dtype not in (np.float32, np.float64):
+        return False
+    return True
+
+
+def to_compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a measurement frame to the compact schema.
+    Unparseable dates/values become NaT/NaN (same as the viewers' old coercion).
+    A frame that is already compact is returned as-is, without copying.
+    """
+    if is_compact(df):
+        return df
+
+    cols = {}
+    n = len(df)
+    for col in df.columns:
+        s = df[col]
+        if col in CATEGORY_COLUMNS:
+            cols[col] = s if isinstance(s.dtype, pd.CategoricalDtype) else s.astype('category')
+        elif col == DATE_COLUMN:
+            cols[col] = pd.to_datetime(s, errors='coerce').astype(DATE_DTYPE)
+        elif col == VALUE_COLUMN:
+            cols[col] = s if s.dtype == np.float32 else _compact_values(s)
+        elif _is_text(s) and n and s.nunique(dropna=True) < _AUTO_CATEGORY_RATIO * n:
+            cols[col] = s.astype('category')
+        elif isinstance(s.dtype, np.dtype) and s.dtype.kind in 'iu':
+            cols[col] = pd.to_numeric(s, downcast='integer')
+        else:
+            cols[col] = s
+    return pd.DataFrame(cols, index=df.index)
+
+
+def read_measurements(path, sep: str = ';', encoding: str = 'latin-1', usecols=None) -> pd.DataFrame:
+    """
+    Read a FEWS CSV export straight into the compact schema.
+    Key text columns are parsed as category by the CSV reader, so the full
+    string columns are never materialized.
+    """
+    dtype = {c: 'category' for c in CATEGORY_COLUMNS}
+    df = pd.read_csv(path, sep=sep, encoding=encoding, usecols=usecols, dtype=dtype,
+                     low_memory=False)
+    return to_compact(df)
+
+
+def memory_report(df: pd.DataFrame, baseline: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Deep memory usage per column (bytes/MB), with a 'TOTAL' row.
+    Pass the original frame as `baseline` to add its usage and the reduction factor.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({'dtype': df.dtypes.astype(str), 'bytes': usage})
+    if baseline is not None:
+        base = baseline.memory_usage(deep=True, index=False)
+        report['baseline_dtype'] = baseline.dtypes.astype(str).reindex(report.index)
+        report['baseline_bytes'] = base.reindex(report.index)
+    report.loc['TOTAL', 'bytes'] = usage.sum()
+    if baseline is not None:
+        report.loc['TOTAL', 'baseline_bytes'] = base.reindex(usage.index).sum()
+        report['reduction'] = (report['baseline_bytes'] / report['bytes']).round(2)
+    report['MB'] = (report['bytes'] / 2**20).round(2)
+    return report
@@ -0,0 +1,147 @@
+# filename: rd_coordinates.py
+"""
+Vectorized RD New (EPSG:28992) <-> WGS84 (EPSG:4326) conversion, no external services.
+
+Uses the polynomial approximation of Schreutelkamp & Strang van Hees (2001), which
+is accurate to well under a metre within the Netherlands. Whole arrays are converted
+in one NumPy expression, so hundreds of thousands of points take milliseconds.
+
+Measurement tables repeat the same few hundred locations on every row, so
+`LocationCoordinates` converts each location once and maps the result back onto
+the rows; it can be saved to CSV so later ingests skip conversion entirely.
+
+Exports:
+    - rd_to_wgs84(x, y)     -> (lon, lat) arrays
+    - wgs84_to_rd(lon, lat) -> (x, y) arrays
+    - LocationCoordinates(path=None)
+        .attach(df, x_col='locatie x', y_col='locatie y') -> df with wgs84_lon/wgs84_lat
+        .save(path=None)
+
+Usage:
+    from rd_coordinates import LocationCoordinates
+    coords = LocationCoordinates('../../data/cache/location_coordinates.csv')
+    df = coords.attach(df)
+    coords.save()
+"""
+
+from __future__ import annotations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Reference point: Amersfoort
+X0, Y0 = 155000.0, 463000.0
+PHI0, LAM0 = 52.15517440, 5.38720621
+
+# RD -> WGS84: (p, q, coefficient) for dX**p * dY**q, result in arc-seconds
+_K = [(0, 1, 3235.65389), (2, 0, -32.58297), (0, 2, -0.24750), (2, 1, -0.84978),
+      (0, 3, -0.06550), (2, 2, -0.01709), (1, 0, -0.00738), (4, 0, 0.00530),
+      (2, 3, -0.00039), (4, 1, 0.00033), (1, 1, -0.00012)]
+_L = [(1, 0, 5260.52916), (1, 1, 105.94684), (1, 2, 2.45656), (3, 0, -0.81885),
+      (1, 3, 0.05594), (3, 1, -0.05607), (0, 1, 0.01199), (3, 2, -0.00256),
+      (1, 4, 0.00128), (0, 2, 0.00022), (2, 0, -0.00022), (5, 0, 0.00026)]
+
+# WGS84 -> RD: (p, q, coefficient) for dPhi**p * dLam**q, result in metres
+_R = [(0, 1, 190094.945), (1, 1, -11832.228), (2, 1, -114.221), (0, 3, -32.391),
+      (1, 0, -0.705), (3, 1, -2.340), (1, 3, -0.608), (0, 2, -0.008), (2, 3, 0.148)]
+_S = [(1, 0, 309056.544), (0, 2, 3638.893), (2, 0, 73.077), (1, 2, -157.984),
+      (3, 0, 59.788), (0, 1, 0.433), (2, 2, -6.439), (1, 1, -0.032), (0, 4, 0.092),
+      (1, 4, -0.054)]
+
+
+def _powers(a: np.ndarray, n: int) -> list:
+    """[a**0 (scalar 1), a, a**2, ..., a**n] by repeated multiplication (cheaper than **)."""
+    out = [1.0, a]
+    for _ in range(n - 1):
+        out.append(out[-1] * a)
+    return out
+
+
+def _poly(a: np.ndarray, b: np.ndarray, terms) -> np.ndarray:
+    """Sum of c * a**p * b**q, grouped per power of `a` to keep temporaries few."""
+    pa = _powers(a, max(t[0] for t in terms))
+    pb = _powers(b, max(t[1] for t in terms))
+    out = np.zeros(np.broadcast(a, b).shape)
+    for p in sorted({t[0] for t in terms}):
+        inner = sum(c * pb[q] for pp, q, c in terms if pp == p)
+        out += inner * pa[p]
+    return out
+
+
+def rd_to_wgs84(x, y) -> tuple[np.ndarray, np.ndarray]:
+    """RD New x/y (metres) -> WGS84 lon/lat (degrees). NaN in, NaN out."""
+    dx = (np.asarray(x, dtype='float64') - X0) * 1e-5
+    dy = (np.asarray(y, dtype='float64') - Y0) * 1e-5
+    lat = PHI0 + _poly(dx, dy, _K) / 3600.0
+    lon = LAM0 + _poly(dx, dy, _L) / 3600.0
+    return lon, lat
+
+
+def wgs84_to_rd(lon, lat) -> tuple[np.ndarray, np.ndarray]:
+    """WGS84 lon/lat (degrees) -> RD New x/y (metres). NaN in, NaN out."""
+    dphi = 0.36 * (np.asarray(lat, dtype='float64') - PHI0)
+    dlam = 0.36 * (np.asarray(lon, dtype='float64') - LAM0)
+    x = X0 + _poly(dphi, dlam, _R)
+    y = Y0 + _poly(dphi, dlam, _S)
+    return x, y
+
+
+class LocationCoordinates:
+    """
+    Cached locatiecode -> (rd_x, rd_y, wgs84_lon, wgs84_lat) table.
+    Only locations not seen before are converted; the rest is a lookup.
+    """
+
+    COLUMNS = ['locatiecode', 'rd_x', 'rd_y', 'wgs84_lon', 'wgs84_lat']
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else None
+        if self.path is not None and self.path.exists():
+            table = pd.read_csv(self.path, dtype={'locatiecode': str})
+        else:
+            table = pd.DataFrame(columns=self.COLUMNS)
+        self.table = table.set_index('locatiecode')[self.COLUMNS[1:]].astype('float64')
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def update(self, locations: pd.DataFrame, x_col: str = 'locatie x', y_col: str = 'locatie y'):
+        """Convert and add locations (one row per locatiecode) that are not cached yet."""
+        first = locations.drop_duplicates('locatiecode').dropna(subset=['locatiecode'])
+        codes = first['locatiecode'].astype(str)
+        todo = first.loc[~codes.isin(self.table.index).to_numpy()]
+        if todo.empty:
+            return self
+        x = pd.to_numeric(todo[x_col], errors='coerce').to_numpy()
+        y = pd.to_numeric(todo[y_col], errors='coerce').to_numpy()
+        lon, lat = rd_to_wgs84(x, y)
+        new = pd.DataFrame({'rd_x': x, 'rd_y': y, 'wgs84_lon': lon, 'wgs84_lat': lat},
+                           index=pd.Index(todo['locatiecode'].astype(str), name='locatiecode'))
+        self.table = pd.concat([self.table, new]) if len(self.table) else new
+        return self
+
+    def attach(self, df: pd.DataFrame, x_col: str = 'locatie x', y_col: str = 'locatie y') -> pd.DataFrame:
+        """Return `df` with wgs84_lon/wgs84_lat columns, looked up per locatiecode."""
+        self.update(df[['locatiecode', x_col, y_col]], x_col, y_col)
+        codes = df['locatiecode']
+        if isinstance(codes.dtype, pd.CategoricalDtype):
+            # Look up each category once and expand through the codes.
+            cats = self.table.reindex(codes.cat.categories.astype(str))
+            idx = codes.cat.codes.to_numpy()
+            lon = np.where(idx >= 0, cats['wgs84_lon'].to_numpy()[idx], np.nan)
+            lat = np.where(idx >= 0, cats['wgs84_lat'].to_numpy()[idx], np.nan)
+        else:
+            pos = self.table.index.get_indexer(codes.astype(str))
+            lon = np.where(pos >= 0, self.table['wgs84_lon'].to_numpy()[pos], np.nan)
+            lat = np.where(pos >= 0, self.table['wgs84_lat'].to_numpy()[pos], np.nan)
+        return df.assign(wgs84_lon=lon, wgs84_lat=lat)
+
+    def save(self, path=None) -> Path:
+        """Write the cache table to CSV (default: the path given at construction)."""
+        path = Path(path) if path is not None else self.path
+        if path is None:
+            raise ValueError('No path given for LocationCoordinates.save()')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.table.reset_index().to_csv(path, index=False)
+        return path
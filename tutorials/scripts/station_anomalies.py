@@ -0,0 +1,262 @@
+# filename: station_anomalies.py
+"""
+Exceedance and anomaly detection across all (station, parameter) series.
+
+All series are processed in one grouped pass (sorted by location, parameter, date);
+nothing loops over stations in Python. Per series, with a trailing window of the
+last `window` samples:
+
+    robust_z        |0.6745 * (x - rolling median) / rolling MAD| > z_threshold
+    rate_of_change  same robust z, on the change per day between consecutive samples
+    norm_high/low   value above/below the norm of the parameter (optional `norms`)
+
+Windows are trailing (only past samples), so results for old measurements never
+change when new data arrives. That is what makes `detect_events_incremental()`
+possible: it only needs the tail of each affected series as context.
+Series stretches with MAD == 0 (constant values, e.g. detection limits) are not scored.
+
+Events table columns:
+    ['locatiecode','fewsparameternaam','datum','meetwaarde','eenheid','event','score']
+
+Exports:
+    - detect_events(df, window=15, min_periods=5, z_threshold=3.5, norms=None)
+    - detect_events_incremental(history, new, ...)   -> events in `new` only
+    - update_events_table(path, events)              -> merged table written to CSV
+    - read_events(path)
+    - read_norms(path)              -> {fewsparameternaam: (min, max)} from a parameter,min,max CSV
+    - index_events(events)          -> {(station, param): events DataFrame} for the viewers
+    - station_event_summary(events) -> per-station counts/latest event for the map
+
+Usage:
+    python station_anomalies.py FYCHEM.csv --events ../../data/station_events.csv
+    python station_anomalies.py FYCHEM.csv --new FYCHEM_new.csv --events ../../data/station_events.csv
+    python station_anomalies.py FYCHEM.csv --events ../../data/station_events.csv --norms norms.csv
+
+Norms CSV: columns `parameter,min,max` (either limit may be empty), `parameter` being
+the fewsparameternaam, e.g. built from the RIVM `normen_stoffen_zoetwater.csv` (DATA.md).
+"""
+
+from __future__ import annotations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from measurement_schema import DATE_DTYPE, MEASUREMENT_COLUMNS, read_measurements, to_compact
+except ImportError:  # imported as scripts.<module> from the tutorials folder
+    from .measurement_schema import DATE_DTYPE, MEASUREMENT_COLUMNS, read_measurements, to_compact
+
+KEYS = ['locatiecode', 'fewsparameternaam']
+EVENT_COLUMNS = KEYS + ['datum', 'meetwaarde', 'eenheid', 'event', 'score']
+
+# Scales MAD to a standard-deviation estimate for normally distributed data.
+_MAD_SCALE = 0.6745
+
+
+def _rolling_median(x: pd.Series, gid: np.ndarray, window: int, min_periods: int) -> pd.Series:
+    """Trailing rolling median per group; `x` must be sorted by group."""
+    r = x.groupby(gid, sort=False).rolling(window, min_periods=min_periods).median()
+    return pd.Series(r.to_numpy(), index=x.index)
+
+
+def _robust_z(x: pd.Series, gid: np.ndarray, window: int, min_periods: int) -> pd.Series:
+    med = _rolling_median(x, gid, window, min_periods)
+    mad = _rolling_median((x - med).abs(), gid, window, min_periods)
+    z = _MAD_SCALE * (x - med) / mad.where(mad > 0)
+    return z
+
+
+def _norm_limits(params: pd.Series, norms) -> tuple[pd.Series, pd.Series]:
+    """Per-row (lower, upper) limits; `norms` maps parameter -> (min, max), either may be None."""
+    if norms is None:
+        nan = pd.Series(np.nan, index=params.index)
+        return nan, nan
+    if isinstance(norms, pd.DataFrame):
+        norms = {p: (row.get('min'), row.get('max')) for p, row in norms.iterrows()}
+    lo = {p: v[0] for p, v in norms.items() if v[0] is not None}
+    hi = {p: v[1] for p, v in norms.items() if v[1] is not None}
+    params = params.astype(object)
+    return params.map(lo).astype(float), params.map(hi).astype(float)
+
+
+def detect_events(df: pd.DataFrame, window: int = 15, min_periods: int = 5,
+                  z_threshold: float = 3.5, norms=None) -> pd.DataFrame:
+    """
+    Events for every series in `df` (see module docstring).
+    `norms`: {fewsparameternaam: (min, max)} or a DataFrame indexed by parameter
+    with 'min'/'max' columns; None skips the norm check.
+    """
+    d = to_compact(df)
+    d = d.loc[d['datum'].notna() & d['meetwaarde'].notna(), [c for c in EVENT_COLUMNS[:5] if c in d.columns]]
+    if 'eenheid' not in d.columns:
+        d = d.assign(eenheid=pd.Series(pd.NA, index=d.index, dtype='category'))
+    if d.empty:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+
+    d = d.sort_values(KEYS + ['datum'], kind='stable').reset_index(drop=True)
+    gid = d.groupby(KEYS, observed=True, sort=False).ngroup().to_numpy()
+    x = d['meetwaarde'].astype('float64')
+
+    z = _robust_z(x, gid, window, min_periods)
+
+    # Change per day; the first sample of each series has no predecessor.
+    first = np.r_[True, gid[1:] != gid[:-1]]
+    dt_days = d['datum'].diff().dt.total_seconds() / 86400.0
+    rate = (x.diff() / dt_days.where(dt_days > 0)).where(~first)
+    rate_z = _robust_z(rate, gid, window, min_periods)
+
+    lo, hi = _norm_limits(d['fewsparameternaam'], norms)
+
+    flags = {
+        'robust_z': (z.abs() > z_threshold, z),
+        'rate_of_change': (rate_z.abs() > z_threshold, rate_z),
+        'norm_high': (x > hi, x / hi),
+        'norm_low': (x < lo, x / lo),
+    }
+    parts = []
+    for name, (mask, score) in flags.items():
+        mask = mask.fillna(False).to_numpy(dtype=bool)
+        if mask.any():
+            parts.append(d.loc[mask].assign(event=name, score=score[mask].to_numpy()))
+    if not parts:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+
+    events = pd.concat(parts, ignore_index=True)
+    events['event'] = events['event'].astype('category')
+    return events.sort_values(KEYS + ['datum', 'event'], kind='stable').reset_index(drop=True)[EVENT_COLUMNS]
+
+
+def detect_events_incremental(history: pd.DataFrame, new: pd.DataFrame, window: int = 15,
+                              min_periods: int = 5, z_threshold: float = 3.5, norms=None) -> pd.DataFrame:
+    """
+    Events for the rows of `new` only, using the last 2 * `window` + 1 samples of
+    each affected series in `history` as context (the rolling MAD needs a window of
+    rolling medians, the rate one extra sample). Rows of `new` whose (station,
+    parameter, datum) already occur in `history` are dropped first, so a cumulative
+    export can be passed as `new`. Gives the same events for the remaining rows as
+    running detect_events() on history + those rows.
+    """
+    hist = to_compact(history)
+    new = to_compact(new)
+    marker = '_is_new'
+
+    affected = hist['locatiecode'].isin(new['locatiecode'].unique()) & \
+        hist['fewsparameternaam'].isin(new['fewsparameternaam'].unique())
+    known = hist.loc[affected & hist['datum'].notna() & hist['meetwaarde'].notna()]
+
+    # FEWS exports are cumulative: rows of `new` that are already in history would be
+    # counted twice and skew the rolling median/MAD, so only genuinely new samples stay.
+    key_cols = KEYS + ['datum']
+    seen = new[key_cols].astype({k: str for k in KEYS}).merge(
+        known[key_cols].astype({k: str for k in KEYS}).drop_duplicates(),
+        on=key_cols, how='left', indicator=True)['_merge'] == 'both'
+    new = new.loc[~seen.to_numpy()]
+    if new.empty:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+
+    context = (known.sort_values(key_cols, kind='stable')
+               .groupby(KEYS, observed=True, sort=False).tail(2 * window + 1))
+
+    combined = pd.concat([context.assign(**{marker: False}), new.assign(**{marker: True})],
+                         ignore_index=True)
+    combined = to_compact(combined)
+
+    # Run on the combined frame but keep the marker aligned to the sorted rows.
+    d = combined.loc[combined['datum'].notna() & combined['meetwaarde'].notna()]
+    d = d.sort_values(KEYS + ['datum'], kind='stable').reset_index(drop=True)
+    events = detect_events(d.drop(columns=marker), window, min_periods, z_threshold, norms)
+    if events.empty:
+        return events
+
+    new_keys = d.loc[d[marker], KEYS + ['datum']].astype({k: str for k in KEYS}).drop_duplicates()
+    keyed = events.astype({k: str for k in KEYS})
+    keep = keyed.merge(new_keys, on=KEYS + ['datum'], how='left', indicator=True)['_merge'] == 'both'
+    return events.loc[keep.to_numpy()].reset_index(drop=True)
+
+
+# ---------- Norms ----------
+def read_norms(path) -> dict:
+    """
+    {parameter: (min, max)} from a CSV with columns parameter,min,max (',' or ';'
+    separated). Empty limits become None, i.e. that side is not checked.
+    """
+    table = pd.read_csv(path, sep=None, engine='python', dtype={'parameter': str})
+    missing = {'parameter', 'min', 'max'} - set(table.columns)
+    if missing:
+        raise ValueError(f'Norms file {path} lacks column(s): {", ".join(sorted(missing))}')
+    limits = table[['min', 'max']].apply(pd.to_numeric, errors='coerce')
+    return {p: tuple(None if pd.isna(v) else float(v) for v in row)
+            for p, row in zip(table['parameter'].str.strip(), limits.itertuples(index=False))}
+
+
+# ---------- Events table ----------
+def read_events(path) -> pd.DataFrame:
+    """Read an events CSV written by update_events_table()."""
+    events = pd.read_csv(path, dtype={k: 'category' for k in KEYS + ['eenheid', 'event']})
+    events['datum'] = pd.to_datetime(events['datum']).astype(DATE_DTYPE)
+    return events
+
+
+def update_events_table(path, events: pd.DataFrame) -> pd.DataFrame:
+    """Merge `events` into the CSV at `path` (one row per series/date/event) and write it."""
+    path = Path(path)
+    if path.exists():
+        old = read_events(path)
+        events = pd.concat([old.astype({k: object for k in KEYS + ['eenheid', 'event']}),
+                            events.astype({k: object for k in KEYS + ['eenheid', 'event']})],
+                           ignore_index=True)
+    events = (events.drop_duplicates(subset=KEYS + ['datum', 'event'], keep='last')
+              .sort_values(KEYS + ['datum', 'event'], kind='stable')
+              .reset_index(drop=True))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    events[EVENT_COLUMNS].to_csv(path, index=False)
+    return events
+
+
+# ---------- Lookups for viewers and map ----------
+class EventIndex(dict):
+    """Plain dict that can be weakly referenced, so figure_cache versions it once."""
+
+
+def index_events(events: pd.DataFrame) -> EventIndex:
+    """{(locatiecode, fewsparameternaam): events of that series}, for O(1) lookup in the viewers."""
+    return EventIndex(((str(st), str(p)), g.reset_index(drop=True))
+                      for (st, p), g in events.groupby(KEYS, observed=True, sort=False))
+
+
+def station_event_summary(events: pd.DataFrame) -> pd.DataFrame:
+    """Per station: number of events, number of series with events, latest event date."""
+    if events.empty:
+        return pd.DataFrame(columns=['locatiecode', 'events', 'series', 'latest_event'])
+    g = events.groupby('locatiecode', observed=True)
+    return pd.DataFrame({
+        'events': g.size(),
+        'series': g['fewsparameternaam'].nunique(),
+        'latest_event': g['datum'].max(),
+    }).reset_index()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Detect exceedances/anomalies in FEWS measurement series.')
+    parser.add_argument('csv', help='FEWS measurement export (history)')
+    parser.add_argument('--new', help='newly ingested export; only its rows are scored')
+    parser.add_argument('--events', required=True, help='events CSV to create/update')
+    parser.add_argument('--window', type=int, default=15)
+    parser.add_argument('--min-periods', type=int, default=5)
+    parser.add_argument('--z', type=float, default=3.5, help='robust z threshold')
+    parser.add_argument('--norms', help='parameter,min,max CSV; adds norm_high/norm_low events')
+    args = parser.parse_args()
+
+    norms = read_norms(args.norms) if args.norms else None
+    usecols = lambda c: c in MEASUREMENT_COLUMNS
+    table = read_measurements(args.csv, usecols=usecols)
+    if args.new:
+        found = detect_events_incremental(table, read_measurements(args.new, usecols=usecols),
+                                          args.window, args.min_periods, args.z, norms)
+    else:
+        found = detect_events(table, args.window, args.min_periods, args.z, norms)
+    merged = update_events_table(args.events, found)
+    print(f'{len(found)} events detected, {len(merged)} in {args.events}')
@@ -0,0 +1,167 @@
+# filename: station_correlation.py
+"""
+Cross-station correlation and lag analysis for one parameter.
+
+Every station's series is put on a shared regular grid (e.g. monthly means), after
+which the full station x station correlation matrix and the best-lag
+cross-correlation are computed with matrix products / FFTs instead of pairwise
+Python loops. Both work on blocks of stations (`chunk_size`) so memory stays
+bounded for large station counts.
+
+Correlations are pairwise-complete: for every pair (and every lag) only grid steps
+where both stations have a value are used, and pairs with fewer than `min_periods`
+overlapping steps get NaN.
+
+Lag convention: lag k > 0 means station B follows station A by k grid steps
+(A at time t correlates with B at t + k), e.g. B is downstream of A.
+
+Exports:
+    - align_to_grid(df, param, freq='MS', stations=None) -> wide DataFrame (grid x stations)
+    - correlation_matrix(wide, min_periods=12, chunk_size=256) -> stations x stations
+    - lagged_correlation(wide, max_lag=6, min_periods=12, chunk_size=64) -> (best_lag, best_corr)
+    - redundant_pairs(corr, threshold=0.95) -> long table of highly correlated pairs
+
+Usage:
+    wide = align_to_grid(df, 'Chloride (mg/l)', freq='MS')
+    corr = correlation_matrix(wide)
+    lag, peak = lagged_correlation(wide, max_lag=3)
+    redundant_pairs(corr, 0.95).head(20)
+"""
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+try:
+    from measurement_schema import to_compact
+except ImportError:  # imported as scripts.<module> from the tutorials folder
+    from .measurement_schema import to_compact
+
+
+# ---------- Alignment ----------
+def align_to_grid(df: pd.DataFrame, param: str, freq: str = 'MS', stations=None,
+                  how: str = 'mean') -> pd.DataFrame:
+    """
+    Aggregate `param` per station onto a regular grid (`freq`, pandas offset alias).
+    Returns grid x stations (float64, NaN where a station has no sample in a step),
+    covering the full date range of the selected data.
+    """
+    d = to_compact(df)
+    mask = (d['fewsparameternaam'] == param) & d['datum'].notna() & d['meetwaarde'].notna()
+    if stations is not None:
+        mask &= d['locatiecode'].isin(list(stations))
+    d = d.loc[mask, ['locatiecode', 'datum', 'meetwaarde']]
+    if d.empty:
+        return pd.DataFrame(dtype='float64')
+
+    d = d.sort_values(['locatiecode', 'datum'], kind='stable')
+    wide = (d.groupby(['locatiecode', pd.Grouper(key='datum', freq=freq)], observed=True)['meetwaarde']
+            .agg(how)
+            .unstack('locatiecode'))
+    grid = pd.date_range(wide.index.min(), wide.index.max(), freq=freq)
+    wide = wide.reindex(grid).astype('float64')
+    wide.columns = wide.columns.astype(str)
+    wide.index.name = 'datum'
+    return wide
+
+
+def _prepared(wide: pd.DataFrame):
+    """Centered values with zeros at gaps, and the validity mask (both T x N float64)."""
+    x = wide.to_numpy(dtype='float64')
+    m = ~np.isnan(x)
+    with np.errstate(invalid='ignore'):
+        x = x - np.nanmean(np.where(m, x, np.nan), axis=0)  # centering improves precision
+    x = np.where(m, x, 0.0)
+    return x, m.astype('float64')
+
+
+def _pearson(n, sa, sb, saa, sbb, sab, min_periods):
+    """Pearson r from pairwise-complete sums; NaN where overlap < min_periods or no variance."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = n * sab - sa * sb
+        var = (n * saa - sa * sa) * (n * sbb - sb * sb)
+        r = cov / np.sqrt(var)
+    r[(n < min_periods) | ~(var > 0)] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+# ---------- Zero-lag correlation ----------
+def correlation_matrix(wide: pd.DataFrame, min_periods: int = 12, chunk_size: int = 256) -> pd.DataFrame:
+    """Pairwise-complete Pearson correlation between all stations (columns of `wide`)."""
+    x, m = _prepared(wide)
+    n_st = x.shape[1]
+    x2 = x * x
+    out = np.empty((n_st, n_st))
+    for i in range(0, n_st, chunk_size):
+        xa, ma, xa2 = x[:, i:i + chunk_size], m[:, i:i + chunk_size], x2[:, i:i + chunk_size]
+        n = np.rint(ma.T @ m)
+        out[i:i + chunk_size] = _pearson(n, xa.T @ m, ma.T @ x, xa2.T @ m, ma.T @ x2, xa.T @ x,
+                                         min_periods)
+    return pd.DataFrame(out, index=wide.columns, columns=wide.columns)
+
+
+# ---------- Lagged correlation ----------
+def _xcorr(fa: np.ndarray, fb: np.ndarray, nfft: int, max_lag: int) -> np.ndarray:
+    """
+    sum_t a[t] * b[t + k] for k = -max_lag..max_lag, for every (a, b) column pair.
+    fa: (ca, F), fb: (cb, F) rfft spectra -> (ca, cb, 2 * max_lag + 1).
+    """
+    c = np.fft.irfft(np.conj(fa)[:, None, :] * fb[None, :, :], n=nfft, axis=-1)
+    return np.concatenate([c[..., nfft - max_lag:], c[..., :max_lag + 1]], axis=-1)
+
+
+def lagged_correlation(wide: pd.DataFrame, max_lag: int = 6, min_periods: int = 12,
+                       chunk_size: int = 64) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Best lag (in grid steps, -max_lag..max_lag) and the correlation at that lag for
+    every station pair. Correlation at each lag is pairwise-complete Pearson; the
+    best lag is the one with the highest correlation.
+    Memory per block is about 6 * chunk_size**2 * (len(wide) + max_lag) * 16 bytes.
+    """
+    x, m = _prepared(wide)
+    t, n_st = x.shape
+    nfft = 1 << int(np.ceil(np.log2(t + max_lag)))  # zero-padded: no circular wrap-around
+
+    spec = {name: np.fft.rfft(arr, n=nfft, axis=0).T
+            for name, arr in (('x', x), ('m', m), ('x2', x * x))}
+    lags = np.arange(-max_lag, max_lag + 1)
+
+    best_lag = np.full((n_st, n_st), np.nan)
+    best_corr = np.full((n_st, n_st), np.nan)
+    for i in range(0, n_st, chunk_size):
+        a = slice(i, i + chunk_size)
+        for j in range(0, n_st, chunk_size):
+            b = slice(j, j + chunk_size)
+            n = np.rint(_xcorr(spec['m'][a], spec['m'][b], nfft, max_lag))
+            r = _pearson(
+                n,
+                _xcorr(spec['x'][a], spec['m'][b], nfft, max_lag),
+                _xcorr(spec['m'][a], spec['x'][b], nfft, max_lag),
+                _xcorr(spec['x2'][a], spec['m'][b], nfft, max_lag),
+                _xcorr(spec['m'][a], spec['x2'][b], nfft, max_lag),
+                _xcorr(spec['x'][a], spec['x'][b], nfft, max_lag),
+                min_periods,
+            )
+            valid = ~np.all(np.isnan(r), axis=-1)
+            k = np.argmax(np.where(np.isnan(r), -np.inf, r), axis=-1)
+            peak = np.take_along_axis(r, k[..., None], axis=-1)[..., 0]
+            best_lag[a, b] = np.where(valid, lags[k], np.nan)
+            best_corr[a, b] = np.where(valid, peak, np.nan)
+
+    cols = wide.columns
+    return (pd.DataFrame(best_lag, index=cols, columns=cols),
+            pd.DataFrame(best_corr, index=cols, columns=cols))
+
+
+def redundant_pairs(corr: pd.DataFrame, threshold: float = 0.95) -> pd.DataFrame:
+    """Station pairs (each once) with correlation >= threshold, strongest first."""
+    vals = corr.to_numpy()
+    i, j = np.triu_indices_from(vals, k=1)
+    r = vals[i, j]
+    keep = r >= threshold
+    pairs = pd.DataFrame({
+        'station_a': corr.index[i[keep]],
+        'station_b': corr.columns[j[keep]],
+        'corr': r[keep],
+    })
+    return pairs.sort_values('corr', ascending=False, kind='stable').reset_index(drop=True)
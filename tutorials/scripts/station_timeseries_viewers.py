@@ -6,8 +6,11 @@ DataFrame requirements:
     columns = ['locatiecode','datum','fewsparameternaam','meetwaarde','eenheid']
 
 Exports:
-    - create_viewer_one_param_two_stations(df, max_gap_days=180)
-    - create_viewer_two_params_two_stations(df, max_gap_days=365)
+    - create_viewer_one_param_two_stations(df, max_gap_days=180, events=None)
+    - create_viewer_two_params_two_stations(df, max_gap_days=365, events=None)
+
+`events` is the lookup from station_anomalies.index_events(); detected events are
+marked with black crosses.
 
 Usage (in a notebook/Colab):
     from station_timeseries_viewers import (
@@ -25,17 +28,20 @@ Usage (in a notebook/Colab):
 from __future__ import annotations
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from ipywidgets import Dropdown, VBox, HBox, Output, Layout
+
+try:
+    from measurement_schema import to_compact
+except ImportError:  # imported as scripts.<module> from the tutorials folder
+    from .measurement_schema import to_compact
+
+# matplotlib and ipywidgets are imported inside the viewer functions, so importing this
+# module (e.g. just for the helpers) stays cheap.
 
 
 # ---------- Shared utilities ----------
 def _coerce_df(df: pd.DataFrame) -> pd.DataFrame:
-    """Ensure datetime and numeric types; return a copy."""
-    df = df.copy()
-    df['datum'] = pd.to_datetime(df['datum'], errors='coerce')
-    df['meetwaarde'] = pd.to_numeric(df['meetwaarde'], errors='coerce')
-    return df
+    """Ensure datetime/numeric types in the compact schema (no copy if already compact)."""
+    return to_compact(df)
 
 
 def _break_gaps(d: pd.DataFrame, max_gap_days: int) -> pd.DataFrame:
@@ -73,12 +79,24 @@ def _unit_of(d: pd.DataFrame) -> str:
     return d['eenheid'].dropna().iloc[0] if (not d.empty and d['eenheid'].notna().any()) else ''
 
 
+def _mark_events(axis, events, station, param):
+    """Mark detected events (station_anomalies.index_events mapping) of one series."""
+    ev = events.get((str(station), str(param))) if events else None
+    if ev is not None and not ev.empty:
+        axis.plot(ev['datum'], ev['meetwaarde'], marker='x', linestyle='None', markersize=9,
+                  color='black', label=f'{station} events')
+
+
 # ---------- Viewer A: One parameter across two stations ----------
-def create_viewer_one_param_two_stations(df: pd.DataFrame, max_gap_days: int = 180):
+def create_viewer_one_param_two_stations(df: pd.DataFrame, max_gap_days: int = 180, events: dict | None = None):
     """
     Interactive viewer: select one parameter and compare two stations (same y-axis if units match).
+    `events`: optional station_anomalies.index_events() mapping; events are marked with crosses.
     Returns a VBox widget you can display().
     """
+    import matplotlib.pyplot as plt
+    from ipywidgets import Dropdown, VBox, HBox, Output, Layout
+
     df = _coerce_df(df)
 
     station_options = sorted(df['locatiecode'].dropna().unique().tolist())
@@ -115,10 +133,13 @@ def create_viewer_one_param_two_stations(df: pd.DataFrame, max_gap_days: int = 1
             if not d1.empty:
                 ax.plot(d1['datum'], d1['meetwaarde_line'], linestyle='-', label=f'{st1} ({unit1})' if unit1 else f'{st1}', color='blue')
                 ax.plot(d1['datum'], d1['meetwaarde'], marker='o', linestyle='None', color='cyan')
+                _mark_events(ax, events, st1, param)
 
             if not d2.empty:
                 ax.plot(d2['datum'], d2['meetwaarde_line'], linestyle='-', label=f'{st2} ({unit2})' if unit2 else f'{st2}', color='green')
                 ax.plot(d2['datum'], d2['meetwaarde'], marker='s', linestyle='None', color='red')
+                if st2 != st1:
+                    _mark_events(ax, events, st2, param)
 
             # Y-axis padding
             all_vals = pd.concat([d1['meetwaarde'], d2['meetwaarde']], ignore_index=True) if (not d1.empty or not d2.empty) else pd.Series(dtype=float)
@@ -152,12 +173,16 @@ def create_viewer_one_param_two_stations(df: pd.DataFrame, max_gap_days: int = 1
 
 
 # ---------- Viewer B: Two stations, potentially different parameters ----------
-def create_viewer_two_params_two_stations(df: pd.DataFrame, max_gap_days: int = 365):
+def create_viewer_two_params_two_stations(df: pd.DataFrame, max_gap_days: int = 365, events: dict | None = None):
     """
     Interactive viewer: select two stations and (optionally different) parameters.
     Uses dual y-axes when params/units differ and both series exist.
+    `events`: optional station_anomalies.index_events() mapping; events are marked with crosses.
     Returns a VBox widget you can display().
     """
+    import matplotlib.pyplot as plt
+    from ipywidgets import Dropdown, VBox, HBox, Output, Layout
+
     df = _coerce_df(df)
 
     station_options = sorted(df['locatiecode'].dropna().unique().tolist())
@@ -197,6 +222,7 @@ def create_viewer_two_params_two_stations(df: pd.DataFrame, max_gap_days: int =
             if not d1.empty:
                 ax.plot(d1['datum'], d1['meetwaarde_line'], linestyle='-', label=f'{st1} — {p1}', color = 'blue')
                 ax.plot(d1['datum'], d1['meetwaarde'], marker='o', linestyle='None', color = 'cyan')
+                _mark_events(ax, events, st1, p1)
                 _pad_ylim(d1['meetwaarde'], ax)
                 ax.set_ylabel(f'{p1}' + (f' ({unit1})' if unit1 else ''))
 
@@ -205,6 +231,8 @@ def create_viewer_two_params_two_stations(df: pd.DataFrame, max_gap_days: int =
                 target_ax = ax2 if use_dual else ax
                 target_ax.plot(d2['datum'], d2['meetwaarde_line'], linestyle='-', label=f'{st2} — {p2}', color = 'green')
                 target_ax.plot(d2['datum'], d2['meetwaarde'], marker='s', linestyle='None', color = 'red')
+                if (st2, p2) != (st1, p1):
+                    _mark_events(target_ax, events, st2, p2)
                 _pad_ylim(d2['meetwaarde'], target_ax)
                 if use_dual:
                     target_ax.set_ylabel(f'{p2}' + (f' ({unit2})' if unit2 else ''))
@@ -6,12 +6,19 @@ DataFrame requirements:
     columns = ['locatiecode','datum','fewsparameternaam','meetwaarde','eenheid']
 
 Exports (Figure-returning):
-    - make_plotly_timeseries(df, station1, station2, param, max_gap_days=180)
-    - make_plotly_timeseries_two_params(df, station1, param1, station2, param2, max_gap_days=365)
+    - make_plotly_timeseries(df, station1, station2, param, max_gap_days=180, events=None)
+    - make_plotly_station_timeseries(df, station, param, max_gap_days=180, events=None)
+    - make_plotly_timeseries_two_params(df, station1, param1, station2, param2, max_gap_days=365, events=None)
 
 Optional (ipywidgets viewers for notebooks):
-    - create_plotly_viewer_one_param_two_stations(df, max_gap_days=180)
-    - create_plotly_viewer_two_params_two_stations(df, max_gap_days=365)
+    - create_plotly_viewer_one_param_two_stations(df, max_gap_days=180, events=None, cache=FIGURE_CACHE)
+    - create_plotly_viewer_two_params_two_stations(df, max_gap_days=365, events=None, cache=FIGURE_CACHE)
+
+The viewers reuse figures from `cache` (figure_cache.FigureCache) when a selection is
+revisited; pass cache=None to always rebuild.
+
+`events` is the lookup from station_anomalies.index_events(); detected events of the
+plotted series are drawn as black crosses.
 """
 
 from __future__ import annotations
@@ -19,12 +26,17 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 
+try:
+    from measurement_schema import to_compact
+    from figure_cache import FIGURE_CACHE, FigureCache
+except ImportError:  # imported as scripts.<module> from the tutorials folder
+    from .measurement_schema import to_compact
+    from .figure_cache import FIGURE_CACHE, FigureCache
+
 # ---------- Shared utilities ----------
 def _coerce_df(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df['datum'] = pd.to_datetime(df['datum'], errors='coerce')
-    df['meetwaarde'] = pd.to_numeric(df['meetwaarde'], errors='coerce')
-    return df
+    """Compact schema (see measurement_schema.py); no copy if `df` is already compact."""
+    return to_compact(df)
 
 def _break_gaps(d: pd.DataFrame, max_gap_days: int) -> pd.DataFrame:
     """Insert NaNs after large time gaps so Plotly breaks the line."""
@@ -44,16 +56,37 @@ def _x_range_from(*date_series: pd.Series):
     all_dates = pd.concat([s for s in date_series if s is not None], ignore_index=True).dropna()
     return [all_dates.min(), all_dates.max()] if not all_dates.empty else None
 
+def _add_event_markers(fig: go.Figure, events, station: str, param: str, yaxis: str = 'y'):
+    """Overlay detected events (station_anomalies.index_events mapping) for one series."""
+    ev = events.get((str(station), str(param))) if events else None
+    if ev is None or ev.empty:
+        return
+    fig.add_trace(go.Scatter(
+        x=ev['datum'], y=ev['meetwaarde'],
+        mode='markers',
+        name=f'{station} — events',
+        marker=dict(symbol='x', size=10, color='black'),
+        customdata=ev['event'].astype(str),
+        hovertemplate=(
+            "<b>%{x|%Y-%m-%d}</b><br>"
+            f"Station: {station}<br>"
+            "Event: %{customdata}<extra></extra>"
+        ),
+        yaxis=yaxis
+    ))
+
 # ---------- Figure-returning APIs ----------
 def make_plotly_timeseries(
     df: pd.DataFrame,
     station1: str,
     station2: str,
     param: str,
-    max_gap_days: int = 180
+    max_gap_days: int = 180,
+    events: dict | None = None
 ) -> go.Figure:
     """
     Two stations, one parameter (single y-axis if units match).
+    `events`: optional station_anomalies.index_events() mapping; matching events are marked.
     Example:
         fig = make_plotly_timeseries(df, 'BOT001', 'AMS002', 'Zuurgraad', 180)
         fig.show()
@@ -104,6 +137,11 @@ def make_plotly_timeseries(
             )
         ))
 
+    if not d1.empty:
+        _add_event_markers(fig, events, station1, param)
+    if not d2.empty and station2 != station1:
+        _add_event_markers(fig, events, station2, param)
+
     x_range = _x_range_from(d1['datum'] if not d1.empty else None,
                             d2['datum'] if not d2.empty else None)
 
@@ -137,15 +175,78 @@ def make_plotly_timeseries(
     return fig
 
 
+def make_plotly_station_timeseries(
+    df: pd.DataFrame,
+    station: str,
+    param: str,
+    max_gap_days: int = 180,
+    events: dict | None = None
+) -> go.Figure:
+    """
+    One station, one parameter (used for the batch report export).
+    `events`: optional station_anomalies.index_events() mapping; matching events are marked.
+    Example:
+        fig = make_plotly_station_timeseries(df, 'NIJ003', 'Zuurgraad', 180)
+        fig.show()
+    """
+    dfx = _coerce_df(df)
+    d = dfx[(dfx['locatiecode'] == station) & (dfx['fewsparameternaam'] == param)][['datum','meetwaarde','eenheid']].dropna(subset=['datum'])
+    d = _break_gaps(d, max_gap_days)
+    unit = _unit_of(d)
+    c1 = '#1f77b4'
+
+    fig = go.Figure()
+    if not d.empty:
+        fig.add_trace(go.Scatter(
+            x=d['datum'], y=d['meetwaarde_line'],
+            mode='lines+markers',
+            name=f'{station}',
+            line=dict(width=2, color=c1),
+            marker=dict(symbol='circle', size=6, color=c1),
+            connectgaps=False,
+            hovertemplate=(
+                "<b>%{x|%Y-%m-%d}</b><br>"
+                f"Station: {station}<br>"
+                f"Param: {param}<br>"
+                "Value: %{y:.4g}" + (f" {unit}" if unit else "") + "<extra></extra>"
+            )
+        ))
+        _add_event_markers(fig, events, station, param)
+
+    fig.update_layout(
+        title=f'{station} — {param}',
+        xaxis=dict(
+            title='Date',
+            rangeslider=dict(visible=True),
+            rangeselector=dict(
+                buttons=[
+                    dict(count=1, label="1m", step="month", stepmode="backward"),
+                    dict(count=6, label="6m", step="month", stepmode="backward"),
+                    dict(count=1, label="1y", step="year", stepmode="backward"),
+                    dict(step="all")
+                ]
+            ),
+            range=_x_range_from(d['datum']) if not d.empty else None
+        ),
+        yaxis=dict(title=f"Value ({unit})" if unit else "Value"),
+        hovermode='x unified',
+        margin=dict(l=60, r=20, t=60, b=60),
+        template='plotly_white'
+    )
+    return fig
+
+
 def make_plotly_timeseries_two_params(
     df: pd.DataFrame,
     station1: str, param1: str,
     station2: str, param2: str,
-    max_gap_days: int = 365
+    max_gap_days: int = 365,
+    events: dict | None = None
 ) -> go.Figure:
     """
     Two stations with (possibly) different parameters.
     Uses secondary y-axis when params/units differ and both series exist.
+    `events`: optional station_anomalies.index_events() mapping; matching events are marked.
     Example:
         fig = make_plotly_timeseries_two_params(df, 'BOT001','Zuurgraad', 'AMS002','Temperatuur', 365)
         fig.show()
@@ -199,6 +300,11 @@ def make_plotly_timeseries_two_params(
             yaxis='y2' if use_dual else 'y'
         ))
 
+    if not d1.empty:
+        _add_event_markers(fig, events, station1, param1)
+    if not d2.empty and (station2, param2) != (station1, param1):
+        _add_event_markers(fig, events, station2, param2, yaxis='y2' if use_dual else 'y')
+
     x_range = _x_range_from(d1['datum'] if not d1.empty else None,
                             d2['datum'] if not d2.empty else None)
 
@@ -237,70 +343,77 @@ def make_plotly_timeseries_two_params(
     return fig
 
 # ---------- Optional ipywidgets viewers (not required for plain Figure use) ----------
-try:
+# ipywidgets is imported when a viewer is created, not at module import.
+def create_plotly_viewer_one_param_two_stations(df: pd.DataFrame, max_gap_days: int = 180, events: dict | None = None,
+        cache: FigureCache | None = FIGURE_CACHE):
     from ipywidgets import Dropdown, VBox, HBox, Output, Layout
-    from IPython.display import display
-
-    def create_plotly_viewer_one_param_two_stations(df: pd.DataFrame, max_gap_days: int = 180):
-        dfx = _coerce_df(df)
-        station_options = sorted(dfx['locatiecode'].dropna().unique().tolist())
-        param_options   = sorted(dfx['fewsparameternaam'].dropna().unique().tolist())
-
-        st1 = Dropdown(options=station_options, description='Station 1:', layout=Layout(width='45%'))
-        st2 = Dropdown(options=station_options, description='Station 2:', layout=Layout(width='45%'))
-        pa  = Dropdown(options=param_options,   description='Parameter:', layout=Layout(width='45%'))
-
-        out = Output(layout=Layout(border='1px solid #ddd'))
-
-        def _draw(*_):
-            with out:
-                out.clear_output(wait=True)
-                fig = make_plotly_timeseries(dfx, st1.value, st2.value, pa.value, max_gap_days=max_gap_days)
-                fig.show()
-
-        # init
-        if station_options and param_options:
-            st1.value = station_options[0]
-            st2.value = station_options[1] if len(station_options) > 1 else station_options[0]
-            pa.value  = param_options[0]
-            _draw()
-
-        for w in (st1, st2, pa):
-            w.observe(_draw, names='value')
-
-        return VBox([HBox([st1, st2]), pa, out])
-
-    def create_plotly_viewer_two_params_two_stations(df: pd.DataFrame, max_gap_days: int = 365):
-        dfx = _coerce_df(df)
-        station_options = sorted(dfx['locatiecode'].dropna().unique().tolist())
-        param_options   = sorted(dfx['fewsparameternaam'].dropna().unique().tolist())
-
-        st1 = Dropdown(options=station_options, description='Station 1:', layout=Layout(width='45%'))
-        st2 = Dropdown(options=station_options, description='Station 2:', layout=Layout(width='45%'))
-        p1  = Dropdown(options=param_options,   description='Param 1:',   layout=Layout(width='45%'))
-        p2  = Dropdown(options=param_options,   description='Param 2:',   layout=Layout(width='45%'))
-
-        out = Output(layout=Layout(border='1px solid #ddd'))
-
-        def _draw(*_):
-            with out:
-                out.clear_output(wait=True)
-                fig = make_plotly_timeseries_two_params(dfx, st1.value, p1.value, st2.value, p2.value, max_gap_days=max_gap_days)
-                fig.show()
-
-        # init
-        if station_options and param_options:
-            st1.value = station_options[0]
-            st2.value = station_options[1] if len(station_options) > 1 else station_options[0]
-            p1.value  = param_options[0]
-            p2.value  = param_options[min(1, len(param_options)-1)]
-            _draw()
-
-        for w in (st1, st2, p1, p2):
-            w.observe(_draw, names='value')
-
-        return VBox([HBox([st1, st2]), HBox([p1, p2]), out])
-
-except Exception:
-    # ipywidgets not available; figure-returning functions still work
-    pass
+
+    dfx = _coerce_df(df)
+    station_options = sorted(dfx['locatiecode'].dropna().unique().tolist())
+    param_options   = sorted(dfx['fewsparameternaam'].dropna().unique().tolist())
+
+    st1 = Dropdown(options=station_options, description='Station 1:', layout=Layout(width='45%'))
+    st2 = Dropdown(options=station_options, description='Station 2:', layout=Layout(width='45%'))
+    pa  = Dropdown(options=param_options,   description='Parameter:', layout=Layout(width='45%'))
+
+    out = Output(layout=Layout(border='1px solid #ddd'))
+
+    def _draw(*_):
+        with out:
+            out.clear_output(wait=True)
+            args = (dfx, st1.value, st2.value, pa.value)
+            kwargs = dict(max_gap_days=max_gap_days, events=events)
+            if cache is not None:
+                cache.show(make_plotly_timeseries, *args, **kwargs)
+            else:
+                make_plotly_timeseries(*args, **kwargs).show()
+
+    # init
+    if station_options and param_options:
+        st1.value = station_options[0]
+        st2.value = station_options[1] if len(station_options) > 1 else station_options[0]
+        pa.value  = param_options[0]
+        _draw()
+
+    for w in (st1, st2, pa):
+        w.observe(_draw, names='value')
+
+    return VBox([HBox([st1, st2]), pa, out])
+
+def create_plotly_viewer_two_params_two_stations(df: pd.DataFrame, max_gap_days: int = 365, events: dict | None = None,
+        cache: FigureCache | None = FIGURE_CACHE):
+    from ipywidgets import Dropdown, VBox, HBox, Output, Layout
+
+    dfx = _coerce_df(df)
+    station_options = sorted(dfx['locatiecode'].dropna().unique().tolist())
+    param_options   = sorted(dfx['fewsparameternaam'].dropna().unique().tolist())
+
+    st1 = Dropdown(options=station_options, description='Station 1:', layout=Layout(width='45%'))
+    st2 = Dropdown(options=station_options, description='Station 2:', layout=Layout(width='45%'))
+    p1  = Dropdown(options=param_options,   description='Param 1:',   layout=Layout(width='45%'))
+    p2  = Dropdown(options=param_options,   description='Param 2:',   layout=Layout(width='45%'))
+
+    out = Output(layout=Layout(border='1px solid #ddd'))
+
+    def _draw(*_):
+        with out:
+            out.clear_output(wait=True)
+            args = (dfx, st1.value, p1.value, st2.value, p2.value)
+            kwargs = dict(max_gap_days=max_gap_days, events=events)
+            if cache is not None:
+                cache.show(make_plotly_timeseries_two_params, *args, **kwargs)
+            else:
+                make_plotly_timeseries_two_params(*args, **kwargs).show()
+
+    # init
+    if station_options and param_options:
+        st1.value = station_options[0]
+        st2.value = station_options[1] if len(station_options) > 1 else station_options[0]
+        p1.value  = param_options[0]
+        p2.value  = param_options[min(1, len(param_options)-1)]
+        _draw()
+
+    for w in (st1, st2, p1, p2):
+        w.observe(_draw, names='value')
+
+    return VBox([HBox([st1, st2]), HBox([p1, p2]), out])
@@ -0,0 +1,51 @@
+# filename: test_rd_coordinates.py
+"""
+Agreement of rd_coordinates.py with the RD/WGS84 pairs in the location GeoJSONs.
+
+    python -m pytest tutorials/scripts/test_rd_coordinates.py
+"""
+
+from __future__ import annotations
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+try:
+    from rd_coordinates import rd_to_wgs84, wgs84_to_rd
+except ImportError:  # imported as scripts.<module> from the tutorials folder
+    from .rd_coordinates import rd_to_wgs84, wgs84_to_rd
+
+DATA_DIR = Path(__file__).resolve().parents[2] / 'data' / 'waternet FEWS data'
+GEOJSONS = ['FYCHEM_unique_locations_with_measurements.geojson',
+            'HB_unique_locations_with_measurements.geojson']
+
+# Metres per degree near 52 N, to express lon/lat differences as distances.
+M_PER_DEG_LAT = 111_250.0
+M_PER_DEG_LON = 68_500.0
+
+
+def _points(name: str):
+    path = DATA_DIR / name
+    if not path.exists():
+        pytest.skip(f'{path} not available')
+    props = [f['properties'] for f in json.loads(path.read_text(encoding='utf-8'))['features']]
+    cols = ['rd_x_original', 'rd_y_original', 'wgs84_lon', 'wgs84_lat']
+    x, y, lon, lat = (np.array([float(p[c]) for p in props]) for c in cols)
+    return x, y, lon, lat
+
+
+@pytest.mark.parametrize('name', GEOJSONS)
+def test_rd_to_wgs84_sub_metre(name):
+    x, y, lon, lat = _points(name)
+    got_lon, got_lat = rd_to_wgs84(x, y)
+    dist = np.hypot((got_lon - lon) * M_PER_DEG_LON, (got_lat - lat) * M_PER_DEG_LAT)
+    assert dist.max() < 1.0
+
+
+@pytest.mark.parametrize('name', GEOJSONS)
+def test_wgs84_to_rd_sub_metre(name):
+    x, y, lon, lat = _points(name)
+    got_x, got_y = wgs84_to_rd(lon, lat)
+    assert np.hypot(got_x - x, got_y - y).max() < 1.0